@@ -1,6 +1,14 @@
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
 
+from .tools.buffered_docs_tools import (
+    create_document,
+    flush_buffered_writes,
+    read_document_as_markdown,
+    write_markdown_to_document,
+    write_to_document,
+)
+
 
 # Per the documentation, for local Ollama models, it is recommended to set
 # the OLLAMA_API_BASE environment variable before running the application.
@@ -14,6 +22,14 @@ root_agent = Agent(
     name="local_ollama_agent",
     description="An agent that uses a local Ollama model.",
     instruction="You are a helpful technical writing assistant.",
-    tools=[],
+    tools=[
+        create_document,
+        write_to_document,
+        write_markdown_to_document,
+        read_document_as_markdown,
+    ],
+    # Document writes are buffered per turn and sent in one batch when the
+    # turn ends; see tools/buffered_docs_tools.py.
+    after_agent_callback=flush_buffered_writes,
 )
  
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""Turn-buffered Google Docs tools for the doc_agent.
+
+Models tend to issue many small write calls in a single turn, one per
+section. Each direct write would pay a document fetch and a batchUpdate, so
+these tools queue writes per document for the current agent invocation and
+return immediately. The queued writes are sent as one converted batch per
+document when the turn ends (flush_buffered_writes is registered as the
+agent's after_agent_callback), when a document's buffer fills up, or before
+the document is read. The results of every flush in the invocation are
+recorded in session state under RESULTS_STATE_KEY when the turn ends.
+
+Buffers of an invocation that ended without running the callback (for
+example because the agent raised) are discarded once they have been idle for
+STALE_BUFFER_SECONDS.
+"""
+
+import logging
+import threading
+import time
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import ToolContext
+
+from . import google_docs_tool
+
+logger = logging.getLogger(__name__)
+
+# Flush a document's buffer early once it holds this many writes
+MAX_BUFFERED_WRITES = 20
+RESULTS_STATE_KEY = "doc_write_results"
+# Discard an invocation's buffers after this long without activity
+STALE_BUFFER_SECONDS = 3600.0
+
+# Pending writes keyed by invocation ID, then document ID
+_buffers: dict[str, dict[str, list[tuple[str, bool]]]] = {}
+# Results of flushes made before the end of the turn, keyed by invocation ID
+_results: dict[str, list[dict[str, Any]]] = {}
+# Monotonic time of each invocation's last buffered write or flush
+_last_active: dict[str, float] = {}
+_buffers_lock = threading.Lock()
+
+
+def create_document(title: str) -> dict[str, Any]:
+    """
+    Creates a new Google Doc.
+
+    Args:
+        title: Title of the new document
+
+    Returns:
+        A dict with the status and the new document_id
+    """
+    document_id = google_docs_tool.create_document(title)
+    return {"status": "success", "document_id": document_id}
+
+
+def write_to_document(document_id: str, content: str, tool_context: ToolContext) -> dict[str, Any]:
+    """
+    Appends plain text to a Google Doc.
+
+    Writes are queued and applied in order at the end of the turn.
+
+    Args:
+        document_id: The Google Doc document ID
+        content: Plain text to append
+
+    Returns:
+        A dict with the status and the number of writes pending for the document
+    """
+    return _buffer_write(tool_context.invocation_id, document_id, content, is_markdown=False)
+
+
+def write_markdown_to_document(
+    document_id: str, markdown_content: str, tool_context: ToolContext
+) -> dict[str, Any]:
+    """
+    Appends markdown to a Google Doc as formatted content.
+
+    Supports headings, lists, bold/italic text, links, code and blockquotes.
+    Writes are queued and applied in order at the end of the turn.
+
+    Args:
+        document_id: The Google Doc document ID
+        markdown_content: Markdown formatted content to append
+
+    Returns:
+        A dict with the status and the number of writes pending for the document
+    """
+    return _buffer_write(
+        tool_context.invocation_id, document_id, markdown_content, is_markdown=True
+    )
+
+
+def read_document_as_markdown(document_id: str, tool_context: ToolContext) -> dict[str, Any]:
+    """
+    Reads a Google Doc as markdown, including writes queued earlier this turn.
+
+    Args:
+        document_id: The Google Doc document ID
+
+    Returns:
+        A dict with the status and the document content as markdown, or the
+        error if the queued writes could not be applied or the read failed
+    """
+    flushed = _flush_document(tool_context.invocation_id, document_id)
+    if flushed["status"] == "error":
+        return {
+            "status": "error",
+            "document_id": document_id,
+            "error": f"Queued writes could not be applied: {flushed['error']}",
+        }
+    try:
+        markdown = google_docs_tool.read_document_as_markdown(document_id)
+    except Exception as e:
+        logger.warning("Failed to read %s", document_id, exc_info=True)
+        return {"status": "error", "document_id": document_id, "error": str(e)}
+    return {"status": "success", "markdown": markdown}
+
+
+def flush_buffered_writes(callback_context: CallbackContext) -> None:
+    """
+    Sends every write buffered during the invocation, one batch per document.
+
+    Registered as the doc_agent's after_agent_callback. The results of every
+    flush in the invocation, including earlier ones, are stored in session
+    state under RESULTS_STATE_KEY.
+    """
+    invocation_id = callback_context.invocation_id
+    with _buffers_lock:
+        documents = _buffers.pop(invocation_id, {})
+        results = _results.pop(invocation_id, [])
+        _last_active.pop(invocation_id, None)
+
+    results.extend(_send_writes(document_id, writes) for document_id, writes in documents.items())
+    if results:
+        callback_context.state[RESULTS_STATE_KEY] = results
+
+
+def _buffer_write(
+    invocation_id: str, document_id: str, content: str, is_markdown: bool
+) -> dict[str, Any]:
+    """Queues a write and flushes the document's buffer if it is full."""
+    with _buffers_lock:
+        _drop_stale_buffers(invocation_id)
+        writes = _buffers.setdefault(invocation_id, {}).setdefault(document_id, [])
+        writes.append((content, is_markdown))
+        pending = len(writes)
+
+    if pending >= MAX_BUFFERED_WRITES:
+        return _flush_document(invocation_id, document_id)
+    return {"status": "buffered", "document_id": document_id, "pending_writes": pending}
+
+
+def _flush_document(invocation_id: str, document_id: str) -> dict[str, Any]:
+    """Sends the writes buffered for one document and records the result."""
+    with _buffers_lock:
+        writes = _buffers.get(invocation_id, {}).pop(document_id, [])
+    result = _send_writes(document_id, writes)
+    if writes:
+        with _buffers_lock:
+            _results.setdefault(invocation_id, []).append(result)
+            _last_active[invocation_id] = time.monotonic()
+    return result
+
+
+def _drop_stale_buffers(invocation_id: str) -> None:
+    """
+    Marks invocation_id active and discards the buffers and results of idle
+    invocations. Must be called with _buffers_lock held.
+    """
+    now = time.monotonic()
+    _last_active[invocation_id] = now
+    for stale_id in [
+        other_id
+        for other_id, last_active in _last_active.items()
+        if now - last_active > STALE_BUFFER_SECONDS
+    ]:
+        documents = _buffers.pop(stale_id, {})
+        _results.pop(stale_id, None)
+        del _last_active[stale_id]
+        dropped = sum(len(writes) for writes in documents.values())
+        if dropped:
+            logger.warning(
+                "Discarded %d buffered writes of invocation %s, which ended without "
+                "flushing them",
+                dropped,
+                stale_id,
+            )
+
+
+def _send_writes(document_id: str, writes: list[tuple[str, bool]]) -> dict[str, Any]:
+    """Sends buffered writes as one batch and reports the outcome."""
+    if not writes:
+        return {"status": "success", "document_id": document_id, "writes": 0}
+    try:
+        google_docs_tool.write_batch_to_document(document_id, writes)
+    except Exception as e:
+        logger.warning("Failed to flush %d writes to %s", len(writes), document_id, exc_info=True)
+        return {
+            "status": "error",
+            "document_id": document_id,
+            "writes": len(writes),
+            "error": str(e),
+        }
+    return {"status": "success", "document_id": document_id, "writes": len(writes)}
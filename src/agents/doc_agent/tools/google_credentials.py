@@ -0,0 +1,217 @@
+"""Shared Google OAuth credential provider.
+
+Credentials are cached in memory and in a token file that is shared by every
+worker process on the host. Reads and refreshes of the token file happen
+under an exclusive file lock and writes use an atomic replace, so concurrent
+workers never see a partially written token. A daemon thread refreshes the
+token shortly before it expires, so refreshes stay off the request path.
+
+Configuration (environment variables):
+- GOOGLE_DOCS_TOKEN_PATH: token file location (default ``token.json``)
+- GOOGLE_DOCS_CLIENT_SECRETS_PATH: OAuth client secrets (default ``credentials.json``)
+- GOOGLE_DOCS_INTERACTIVE_AUTH: ``1`` to allow the browser OAuth flow, ``0``
+  to fail fast instead (default: allowed only when stdin is a terminal)
+"""
+
+import datetime
+import fcntl
+import logging
+import os
+import sys
+import threading
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATH_ENV_VAR = "GOOGLE_DOCS_TOKEN_PATH"
+CLIENT_SECRETS_PATH_ENV_VAR = "GOOGLE_DOCS_CLIENT_SECRETS_PATH"
+INTERACTIVE_AUTH_ENV_VAR = "GOOGLE_DOCS_INTERACTIVE_AUTH"
+
+# Refresh this long before the token expires
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+# Wait this long before retrying a failed background refresh
+REFRESH_RETRY_SECONDS = 30.0
+
+
+class CredentialsUnavailableError(RuntimeError):
+    """Raised when no usable credentials exist and interactive auth is disabled."""
+
+
+class CredentialProvider:
+    """Provides Google OAuth credentials shared across threads and processes."""
+
+    def __init__(
+        self,
+        token_path: str,
+        client_secrets_path: str,
+        scopes: Sequence[str],
+        interactive: bool,
+        refresh_margin: datetime.timedelta = REFRESH_MARGIN,
+    ) -> None:
+        self.token_path = token_path
+        self.client_secrets_path = client_secrets_path
+        self.scopes = list(scopes)
+        self.interactive = interactive
+        self.refresh_margin = refresh_margin
+        self._creds: Credentials | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: threading.Thread | None = None
+        self._refresher_pid: int | None = None
+
+    def get(self) -> Credentials:
+        """
+        Returns valid credentials.
+
+        Cached credentials are returned without I/O. The token file is only
+        read, and the token only refreshed synchronously, when the cached
+        credentials are missing or already expired.
+        """
+        creds = self._creds
+        if creds is None or not creds.valid:
+            with self._lock:
+                creds = self._creds
+                if creds is None or not creds.valid:
+                    creds = self._load_or_refresh()
+                    self._creds = creds
+        self._ensure_refresher()
+        return creds
+
+    def stop(self) -> None:
+        """Stops the background refresh thread."""
+        self._stop.set()
+
+    def _load_or_refresh(self) -> Credentials:
+        """Loads the shared token, refreshing or authorizing it if needed."""
+        with self._token_file_lock():
+            # Another process may already have refreshed the shared token
+            creds = self._read_token()
+            if creds is not None and not self._needs_refresh(creds):
+                return creds
+
+            if creds is not None and creds.refresh_token:
+                creds.refresh(Request())
+            elif self.interactive:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.client_secrets_path, self.scopes
+                )
+                creds = flow.run_local_server(port=0)
+            else:
+                raise CredentialsUnavailableError(
+                    f"No refreshable token at {self.token_path} and interactive "
+                    f"auth is disabled; set {INTERACTIVE_AUTH_ENV_VAR}=1 and run "
+                    "once from a terminal to authorize."
+                )
+            self._write_token(creds)
+            return creds
+
+    def _needs_refresh(self, creds: Credentials) -> bool:
+        """Returns True if credentials are invalid or expire within the margin."""
+        if not creds.valid:
+            return True
+        return self._seconds_until_refresh(creds) <= 0
+
+    def _seconds_until_refresh(self, creds: Credentials) -> float:
+        """Seconds until the credentials enter the refresh margin."""
+        if creds.expiry is None:
+            return float("inf")
+        expiry: datetime.datetime = creds.expiry.replace(tzinfo=datetime.UTC)
+        now = datetime.datetime.now(datetime.UTC)
+        return (expiry - self.refresh_margin - now).total_seconds()
+
+    def _ensure_refresher(self) -> None:
+        """Starts the background refresh thread in this process if needed."""
+        # Threads do not survive fork, so each process runs its own refresher
+        if self._refresher_pid == os.getpid() and self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid() and self._refresher is not None:
+                return
+            self._stop = threading.Event()
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="google-credentials-refresh", daemon=True
+            )
+            self._refresher_pid = os.getpid()
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        """Refreshes the shared token shortly before it expires."""
+        stop = self._stop
+        refreshed = False
+        while True:
+            creds = self._creds
+            delay = self._seconds_until_refresh(creds) if creds is not None else 0.0
+            if delay == float("inf"):
+                return
+            if refreshed and delay <= 0:
+                # Token lifetime is shorter than the margin; avoid spinning
+                delay = REFRESH_RETRY_SECONDS
+            if stop.wait(max(delay, 0.0)):
+                return
+            refreshed = True
+            try:
+                with self._lock:
+                    self._creds = self._load_or_refresh()
+            except Exception:
+                logger.warning("Background credential refresh failed", exc_info=True)
+                if stop.wait(REFRESH_RETRY_SECONDS):
+                    return
+
+    @contextmanager
+    def _token_file_lock(self) -> Iterator[None]:
+        """Holds an exclusive lock on the token file across processes."""
+        lock_path = f"{self.token_path}.lock"
+        os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_token(self) -> Credentials | None:
+        """Reads the token file, returning None if it does not exist."""
+        if not os.path.exists(self.token_path):
+            return None
+        creds: Credentials = Credentials.from_authorized_user_file(self.token_path, self.scopes)
+        return creds
+
+    def _write_token(self, creds: Credentials) -> None:
+        """Atomically replaces the token file."""
+        tmp_path = f"{self.token_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as token:
+            token.write(creds.to_json())
+        os.replace(tmp_path, self.token_path)
+
+
+_default_provider: CredentialProvider | None = None
+_default_provider_lock = threading.Lock()
+
+
+def get_credential_provider(scopes: Sequence[str]) -> CredentialProvider:
+    """Returns the process-wide credential provider configured from the environment."""
+    global _default_provider
+    with _default_provider_lock:
+        if _default_provider is None:
+            _default_provider = CredentialProvider(
+                token_path=os.environ.get(TOKEN_PATH_ENV_VAR, "token.json"),
+                client_secrets_path=os.environ.get(
+                    CLIENT_SECRETS_PATH_ENV_VAR, "credentials.json"
+                ),
+                scopes=scopes,
+                interactive=_interactive_auth_allowed(),
+            )
+        return _default_provider
+
+
+def _interactive_auth_allowed() -> bool:
+    """Returns True if the browser OAuth flow may be used."""
+    setting = os.environ.get(INTERACTIVE_AUTH_ENV_VAR)
+    if setting is not None:
+        return setting.lower() in ("1", "true", "yes", "on")
+    return sys.stdin is not None and sys.stdin.isatty()
@@ -1,16 +1,23 @@
 """Google Docs integration tool with Markdown support."""
 
+import hashlib
+import json
+import mmap
+import multiprocessing
 import os.path
 import re
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Any
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from markdown_it import MarkdownIt
 
-# If modifying these scopes, delete the file token.json.
+from .google_credentials import get_credential_provider
+
+# If modifying these scopes, delete the token file (token.json by default).
 SCOPES = ["https://www.googleapis.com/auth/documents"]
 
 # Google Docs heading style mapping
@@ -23,6 +30,49 @@ HEADING_STYLE_MAP = {
     6: "HEADING_6",
 }
 
+# Markdown writes larger than this are split into chunks and journaled to a
+# local file, so that a retried write resumes from the first unacknowledged
+# chunk instead of appending everything again.
+JOURNAL_THRESHOLD = 50_000
+JOURNAL_CHUNK_SIZE = 20_000
+JOURNAL_DIR_ENV_VAR = "GOOGLE_DOCS_JOURNAL_DIR"
+DEFAULT_JOURNAL_DIR = ".docs_journal"
+
+# Target size in bytes of each block-aligned chunk of a markdown file
+FILE_CHUNK_SIZE = 256 * 1024
+
+_FENCE_RE = re.compile(rb"^ {0,3}(`{3,}|~{3,})")
+_LIST_MARKER_RE = re.compile(rb"^(?:[-*+]|\d{1,9}[.)])(?:[ \t]|\r?$)")
+_REFERENCE_DEFINITION_RE = re.compile(rb"^ {0,3}\[[^\]\n]+\]:", re.MULTILINE)
+# HTML blocks that may contain blank lines, paired with the pattern that ends them
+_HTML_BLOCK_RES = [
+    (
+        re.compile(rb"^ {0,3}<(?:script|pre|style|textarea)(?:[ \t>]|\r?$)", re.IGNORECASE),
+        re.compile(rb"</(?:script|pre|style|textarea)>", re.IGNORECASE),
+    ),
+    (re.compile(rb"^ {0,3}<!--"), re.compile(rb"-->")),
+    (re.compile(rb"^ {0,3}<\?"), re.compile(rb"\?>")),
+    (re.compile(rb"^ {0,3}<![A-Za-z]"), re.compile(rb">")),
+    (re.compile(rb"^ {0,3}<!\[CDATA\["), re.compile(rb"\]\]>")),
+]
+
+# Only the fields read_document_as_markdown renders are requested
+READ_FIELDS = (
+    "revisionId,"
+    "body(content(paragraph("
+    "elements(textRun(content,textStyle(bold,italic,link(url),weightedFontFamily(fontFamily)))),"
+    "paragraphStyle(namedStyleType,indentStart(magnitude)),"
+    "bullet(listId,nestingLevel)))),"
+    "lists"
+)
+MONOSPACE_FONT = "Courier New"
+ORDERED_GLYPH_TYPES = {"DECIMAL", "ZERO_DECIMAL", "ALPHA", "UPPER_ALPHA", "ROMAN", "UPPER_ROMAN"}
+_MARKDOWN_ESCAPE_RE = re.compile(r"([\\`*_\[\]])")
+
+# Markdown exports keyed by document ID, holding (revision ID, markdown)
+READ_CACHE_SIZE = 32
+_read_cache: OrderedDict[str, tuple[str, str]] = OrderedDict()
+
 
 def create_document(title: str) -> str:
     """Creates a new Google Doc and returns the document ID."""
@@ -34,7 +84,9 @@ def create_document(title: str) -> str:
     return document.get("documentId")
 
 
-def write_markdown_to_document(document_id: str, markdown_content: str) -> None:
+def write_markdown_to_document(
+    document_id: str, markdown_content: str, render_path: str | None = None
+) -> None:
     """
     Converts markdown content to formatted Google Doc content.
 
@@ -48,22 +100,29 @@ def write_markdown_to_document(document_id: str, markdown_content: str) -> None:
     - Blockquotes
     - Horizontal rules
 
+    Content larger than JOURNAL_THRESHOLD characters is written in chunks
+    and journaled, so that retrying a failed write resumes where it stopped.
+
     Args:
         document_id: The Google Doc document ID
         markdown_content: Markdown formatted content string
+        render_path: If given, append the converted requests to this JSON-lines
+            file instead of sending them (see render_document_requests)
     """
+    if render_path is not None:
+        render_document_requests(document_id, markdown_content, render_path)
+        return
+
     creds = _get_credentials()
     service = build("docs", "v1", credentials=creds)
 
+    if len(markdown_content) > JOURNAL_THRESHOLD:
+        _write_markdown_journaled(service, document_id, markdown_content)
+        return
+
     # Get the document to find the end index for appending
     doc = service.documents().get(documentId=document_id).execute()
-    body = doc.get("body", {})
-    content_elements = body.get("content", [])
-    if content_elements:
-        end_index = content_elements[-1].get("endIndex", 1)
-        insert_index = end_index - 1
-    else:
-        insert_index = 1
+    insert_index = _get_insert_index(doc)
 
     # Parse markdown and convert to Google Docs requests
     requests = _markdown_to_docs_requests(markdown_content, insert_index)
@@ -85,13 +144,7 @@ def write_to_document(document_id: str, content: str) -> None:
 
     # Get the document to find the end index for appending
     doc = service.documents().get(documentId=document_id).execute()
-    body = doc.get("body", {})
-    content_elements = body.get("content", [])
-    if content_elements:
-        end_index = content_elements[-1].get("endIndex", 1)
-        insert_index = end_index - 1
-    else:
-        insert_index = 1
+    insert_index = _get_insert_index(doc)
 
     requests = [
         {
@@ -106,13 +159,759 @@ def write_to_document(document_id: str, content: str) -> None:
     ).execute()
 
 
-def _markdown_to_docs_requests(markdown_content: str, start_index: int) -> list[dict[str, Any]]:
+def write_batch_to_document(document_id: str, writes: list[tuple[str, bool]]) -> None:
+    """
+    Appends several pieces of content to a Google Doc in a single batchUpdate.
+
+    The document is fetched once and each piece is converted at the running
+    end index, so the result matches calling write_to_document and
+    write_markdown_to_document in order.
+
+    Args:
+        document_id: The Google Doc document ID
+        writes: (content, is_markdown) pairs, appended in order
+    """
+    creds = _get_credentials()
+    service = build("docs", "v1", credentials=creds)
+
+    # Get the document to find the end index for appending
+    doc = service.documents().get(documentId=document_id).execute()
+    insert_index = _get_insert_index(doc)
+
+    requests: list[dict[str, Any]] = []
+    for content, is_markdown in writes:
+        if is_markdown:
+            write_requests = _markdown_to_docs_requests(content, insert_index)
+        elif content:
+            write_requests = [
+                {
+                    "insertText": {
+                        "location": {"index": insert_index},
+                        "text": content,
+                    }
+                }
+            ]
+        else:
+            write_requests = []
+        requests.extend(write_requests)
+        insert_index += _inserted_length(write_requests)
+
+    if requests:
+        service.documents().batchUpdate(
+            documentId=document_id, body={"requests": requests}
+        ).execute()
+
+
+def render_document_requests(
+    document_id: str, content: str, output_path: str, is_markdown: bool = True
+) -> int:
+    """
+    Converts content to batchUpdate bodies and appends them to a JSON-lines
+    file instead of sending them.
+
+    Nothing is read from the document: requests are rendered relative to
+    index 0 and shifted to the document's end index by
+    replay_rendered_requests. Each line holds the document ID, an ID unique
+    to this write, the chunk number, content hash of the chunk, inserted
+    length and the batchUpdate body.
+
+    Args:
+        document_id: The Google Doc document ID the requests target
+        content: Markdown (or plain text) content
+        output_path: JSON-lines file to append to
+        is_markdown: Whether to convert content from markdown
+
+    Returns:
+        The number of chunks rendered
+    """
+    env: dict[str, Any] = {}
+    if is_markdown:
+        chunks = _split_markdown_chunks(content, JOURNAL_CHUNK_SIZE, env)
+    else:
+        chunks = [(0, len(content))] if content else []
+    references = env.get("references", {})
+    write_id = uuid.uuid4().hex
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "a") as f:
+        for chunk_number, (start, end) in enumerate(chunks):
+            chunk = content[start:end]
+            if is_markdown:
+                requests = _markdown_to_docs_requests(chunk, 0, references)
+            else:
+                requests = [{"insertText": {"location": {"index": 0}, "text": chunk}}]
+            record = {
+                "document_id": document_id,
+                "write_id": write_id,
+                "chunk": chunk_number,
+                "content_hash": hashlib.sha256(chunk.encode("utf-8")).hexdigest(),
+                "length": _inserted_length(requests),
+                "body": {"requests": requests},
+            }
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return len(chunks)
+
+
+def replay_rendered_requests(paths: list[str], max_concurrency: int = 4) -> dict[str, int]:
+    """
+    Sends batchUpdate bodies recorded by render_document_requests.
+
+    Files are streamed line by line. The lines of each write are sent in
+    chunk order, appended at the document's current end index; up to
+    max_concurrency documents are written at once.
+
+    Acknowledged chunks are recorded in a write journal (see
+    _write_markdown_journaled) keyed by the write's ID, so replaying the same
+    files again resumes after the last acknowledged chunk of each write
+    instead of duplicating content. Journals of completed writes are kept so
+    that reruns skip them; separate writes of identical content are each sent.
+
+    Args:
+        paths: JSON-lines files to replay, in order
+        max_concurrency: Maximum number of documents written concurrently
+
+    Returns:
+        Counts of document writes, chunks and requests sent, and of chunks
+        skipped because they were already acknowledged
+    """
+    creds = _get_credentials()
+    stats = {"documents": 0, "chunks": 0, "requests": 0, "skipped_chunks": 0}
+    in_flight: dict[str, Future[dict[str, int]]] = {}
+
+    def collect(future: Future[dict[str, int]]) -> None:
+        for key, count in future.result().items():
+            stats[key] += count
+
+    def submit(
+        executor: ThreadPoolExecutor, document_id: str, records: list[dict[str, Any]]
+    ) -> None:
+        # Writes to the same document must not overlap or reorder
+        previous = in_flight.pop(document_id, None)
+        if previous is not None:
+            collect(previous)
+        while len(in_flight) >= max_concurrency * 2:
+            oldest = next(iter(in_flight))
+            collect(in_flight.pop(oldest))
+        in_flight[document_id] = executor.submit(
+            _replay_document_records, creds, document_id, records
+        )
+        stats["documents"] += 1
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        document_id: str | None = None
+        write_id: str | None = None
+        records: list[dict[str, Any]] = []
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record["write_id"] != write_id:
+                        if records and document_id is not None:
+                            submit(executor, document_id, records)
+                        document_id, write_id = record["document_id"], record["write_id"]
+                        records = []
+                    records.append(record)
+        if records and document_id is not None:
+            submit(executor, document_id, records)
+        for future in in_flight.values():
+            collect(future)
+
+    return stats
+
+
+def _replay_document_records(
+    creds: Any, document_id: str, records: list[dict[str, Any]]
+) -> dict[str, int]:
+    """
+    Appends one rendered write to a document, chunk by chunk, skipping the
+    chunks its journal has already acknowledged.
+
+    Returns counts of the chunks and requests sent and the chunks skipped.
+    """
+    write_id = records[0]["write_id"]
+    journal_path = _journal_path(document_id, write_id)
+
+    # Service objects are not thread-safe, so each worker builds its own
+    service = build("docs", "v1", credentials=creds)
+    doc = service.documents().get(documentId=document_id).execute()
+    insert_index = _get_insert_index(doc)
+
+    journal = _load_journal(journal_path)
+    if journal is None or journal.get("write_id") != write_id:
+        journal = {
+            "document_id": document_id,
+            "write_id": write_id,
+            "chunks": [
+                {"chunk": record["chunk"], "sha256": record["content_hash"]}
+                for record in records
+            ],
+            "last_acked_chunk": -1,
+            "revision_id": None,
+            "end_index": insert_index,
+        }
+        _save_journal(journal_path, journal)
+
+    next_chunk = journal["last_acked_chunk"] + 1
+
+    # As in _write_markdown_journaled, a chunk whose length matches the
+    # document's growth since the last acknowledgement is treated as written
+    if (
+        next_chunk < len(records)
+        and doc.get("revisionId") != journal["revision_id"]
+        and insert_index == journal["end_index"] + records[next_chunk]["length"]
+    ):
+        journal["last_acked_chunk"] = next_chunk
+        journal["revision_id"] = doc.get("revisionId")
+        journal["end_index"] = insert_index
+        _save_journal(journal_path, journal)
+        next_chunk += 1
+
+    sent = {"chunks": 0, "requests": 0, "skipped_chunks": next_chunk}
+    for chunk_number in range(next_chunk, len(records)):
+        record = records[chunk_number]
+        requests = record["body"]["requests"]
+        revision_id = journal["revision_id"]
+        if requests:
+            response = service.documents().batchUpdate(
+                documentId=document_id,
+                body={"requests": _offset_requests(requests, insert_index)},
+            ).execute()
+            revision_id = (response or {}).get("writeControl", {}).get("requiredRevisionId")
+        insert_index += record["length"]
+
+        journal["last_acked_chunk"] = chunk_number
+        journal["revision_id"] = revision_id
+        journal["end_index"] = insert_index
+        _save_journal(journal_path, journal)
+        sent["chunks"] += 1
+        sent["requests"] += len(requests)
+    return sent
+
+
+def write_markdown_file(document_id: str, path: str, max_workers: int | None = None) -> None:
+    """
+    Converts a large markdown file to formatted Google Doc content.
+
+    The file is memory-mapped and split at top-level block boundaries (never
+    inside a fenced code block, HTML block or list). Link reference
+    definitions are collected from every chunk first, so reference-style
+    links resolve regardless of which chunk defines them. Chunks are then
+    converted in a process pool and sent in order as one batchUpdate per
+    chunk, so memory use is bounded by the number of chunks in flight rather
+    than the file size.
+
+    Args:
+        document_id: The Google Doc document ID
+        path: Path to a UTF-8 markdown file
+        max_workers: Number of conversion processes (defaults to the CPU count)
+    """
+    if os.path.getsize(path) == 0:
+        return
+
+    creds = _get_credentials()
+    service = build("docs", "v1", credentials=creds)
+
+    # Get the document to find the end index for appending
+    doc = service.documents().get(documentId=document_id).execute()
+    insert_index = _get_insert_index(doc)
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks = list(_iter_markdown_file_chunks(mm, FILE_CHUNK_SIZE))
+
+    workers = max_workers or os.cpu_count() or 1
+    # Forking a process that runs the credential refresh thread is unsafe
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        # The first definition of a label wins, as when parsing the whole file
+        references: dict[str, Any] = {}
+        collected = [
+            executor.submit(_collect_file_chunk_references, path, start, end)
+            for start, end in chunks
+        ]
+        for chunk_references in collected:
+            for label, reference in chunk_references.result().items():
+                references.setdefault(label, reference)
+
+        # Keep a bounded window of conversions in flight, in file order
+        pending: list[Future[tuple[list[dict[str, Any]], int]]] = []
+        for start, end in chunks:
+            pending.append(executor.submit(_convert_file_chunk, path, start, end, references))
+            if len(pending) >= workers * 2:
+                insert_index = _send_converted_chunk(
+                    service, document_id, pending.pop(0), insert_index
+                )
+        for future in pending:
+            insert_index = _send_converted_chunk(service, document_id, future, insert_index)
+
+
+def _iter_markdown_file_chunks(mm: mmap.mmap, target_size: int) -> Iterator[tuple[int, int]]:
+    """
+    Yields (start, end) byte ranges of a markdown buffer, each roughly
+    target_size bytes and split only where a new top-level block starts.
+
+    A split point is the start of an unindented, non-list line that follows a
+    blank line outside of any fenced code block or HTML block that may span
+    blank lines, so fences, HTML blocks, lists and their continuation
+    paragraphs are never divided.
+    """
+    size = len(mm)
+    start = 0
+    pos = 0
+    fence: bytes | None = None
+    html_end: re.Pattern[bytes] | None = None
+    previous_blank = False
+
+    while pos < size:
+        newline = mm.find(b"\n", pos)
+        line_end = size if newline == -1 else newline + 1
+        line = mm[pos:line_end]
+        stripped = line.strip()
+
+        fence_match = _FENCE_RE.match(line)
+        if fence is not None:
+            if (
+                fence_match
+                and fence_match.group(1)[:1] == fence[:1]
+                and len(fence_match.group(1)) >= len(fence)
+                and not line[fence_match.end() :].strip()
+            ):
+                fence = None
+        elif html_end is not None:
+            if html_end.search(line):
+                html_end = None
+        else:
+            if (
+                pos - start >= target_size
+                and previous_blank
+                and stripped
+                and line[:1] not in (b" ", b"\t")
+                and not _LIST_MARKER_RE.match(line)
+            ):
+                yield start, pos
+                start = pos
+            if fence_match:
+                fence = fence_match.group(1)
+            else:
+                html_end = _html_block_end(line)
+
+        previous_blank = not stripped
+        pos = line_end
+
+    if start < size:
+        yield start, size
+
+
+def _html_block_end(line: bytes) -> re.Pattern[bytes] | None:
+    """
+    Returns the end pattern of an HTML block opened by line that may contain
+    blank lines, or None if the line does not open one or also closes it.
+    """
+    for start_re, end_re in _HTML_BLOCK_RES:
+        match = start_re.match(line)
+        if match:
+            return None if end_re.search(line, match.end()) else end_re
+    return None
+
+
+def _collect_file_chunk_references(path: str, start: int, end: int) -> dict[str, Any]:
+    """Returns the link reference definitions in one byte range of a markdown file."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunk = mm[start:end]
+    # Most chunks define no references, so skip parsing them
+    if not _REFERENCE_DEFINITION_RE.search(chunk):
+        return {}
+    env: dict[str, Any] = {}
+    MarkdownIt("commonmark").parse(chunk.decode("utf-8"), env)
+    references: dict[str, Any] = env.get("references", {})
+    return references
+
+
+def _convert_file_chunk(
+    path: str, start: int, end: int, references: dict[str, Any]
+) -> tuple[list[dict[str, Any]], int]:
+    """
+    Converts one byte range of a markdown file in a worker process.
+
+    Requests are produced relative to index 0; the caller shifts them to the
+    document position. Returns the requests and the inserted length.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        markdown_content = mm[start:end].decode("utf-8")
+    requests = _markdown_to_docs_requests(markdown_content, 0, references)
+    return requests, _inserted_length(requests)
+
+
+def _send_converted_chunk(
+    service: Any,
+    document_id: str,
+    future: Future[tuple[list[dict[str, Any]], int]],
+    insert_index: int,
+) -> int:
+    """Shifts a converted chunk to insert_index, sends it and returns the new end."""
+    requests, length = future.result()
+    if requests:
+        service.documents().batchUpdate(
+            documentId=document_id, body={"requests": _offset_requests(requests, insert_index)}
+        ).execute()
+    return insert_index + length
+
+
+def _offset_requests(requests: list[dict[str, Any]], offset: int) -> list[dict[str, Any]]:
+    """Shifts the indices of batch update requests by offset, in place."""
+    for request in requests:
+        for body in request.values():
+            if "location" in body:
+                body["location"]["index"] += offset
+            if "range" in body:
+                body["range"]["startIndex"] += offset
+                body["range"]["endIndex"] += offset
+    return requests
+
+
+def read_document_as_markdown(document_id: str) -> str:
+    """
+    Exports a Google Doc as markdown.
+
+    Mirrors the styles written by write_markdown_to_document: headings,
+    bulleted and numbered lists, bold/italic text, links, monospace code and
+    indented quotes. Only the fields needed for rendering are requested.
+    Results are cached by revision ID, so reading an unchanged document again
+    only costs a revision lookup.
+
+    Args:
+        document_id: The Google Doc document ID
+
+    Returns:
+        The document content as a markdown string
+    """
+    creds = _get_credentials()
+    service = build("docs", "v1", credentials=creds)
+
+    cached = _read_cache.get(document_id)
+    if cached is not None:
+        doc = service.documents().get(documentId=document_id, fields="revisionId").execute()
+        if doc.get("revisionId") == cached[0]:
+            _read_cache.move_to_end(document_id)
+            return cached[1]
+
+    doc = service.documents().get(documentId=document_id, fields=READ_FIELDS).execute()
+    revision_id = doc.get("revisionId", "")
+    markdown = _render_document(doc)
+    if revision_id:
+        _read_cache[document_id] = (revision_id, markdown)
+        _read_cache.move_to_end(document_id)
+        while len(_read_cache) > READ_CACHE_SIZE:
+            _read_cache.popitem(last=False)
+    return markdown
+
+
+def _render_document(doc: dict[str, Any]) -> str:
+    """Renders a field-masked documents.get response as markdown."""
+    blocks = [
+        _paragraph_to_block(element["paragraph"])
+        for element in doc.get("body", {}).get("content", [])
+        if element.get("paragraph")
+    ]
+    return _blocks_to_markdown(blocks, doc.get("lists", {}))
+
+
+def _paragraph_to_block(paragraph: dict[str, Any]) -> dict[str, Any]:
+    """
+    Converts a Docs paragraph into a markdown block description.
+
+    Returns a dict with 'type' (heading, bullet, quote, code or paragraph),
+    the rendered 'text' and, depending on the type, 'level', 'list_id' and
+    'nesting'.
+    """
+    runs = [
+        element["textRun"]
+        for element in paragraph.get("elements", [])
+        if "textRun" in element
+    ]
+    # Drop the paragraph's trailing newline
+    if runs and runs[-1].get("content", "").endswith("\n"):
+        runs[-1] = {**runs[-1], "content": runs[-1]["content"][:-1]}
+    runs = [run for run in runs if run.get("content")]
+
+    style = paragraph.get("paragraphStyle", {})
+    named_style = style.get("namedStyleType", "")
+    bullet = paragraph.get("bullet")
+
+    if runs and all(_is_monospace(run) for run in runs) and not bullet:
+        return {"type": "code", "text": "".join(run["content"] for run in runs)}
+
+    text = "".join(_render_text_run(run) for run in runs)
+    if named_style.startswith("HEADING_"):
+        return {"type": "heading", "text": text, "level": int(named_style[-1])}
+    if bullet:
+        return {
+            "type": "bullet",
+            "text": text,
+            "list_id": bullet.get("listId", ""),
+            "nesting": bullet.get("nestingLevel", 0),
+        }
+    if style.get("indentStart", {}).get("magnitude", 0) > 0:
+        return {"type": "quote", "text": text}
+    return {"type": "paragraph", "text": text}
+
+
+def _is_monospace(run: dict[str, Any]) -> bool:
+    """Returns True if a text run uses the monospace code font."""
+    font: str | None = run.get("textStyle", {}).get("weightedFontFamily", {}).get("fontFamily")
+    return font == MONOSPACE_FONT
+
+
+def _render_text_run(run: dict[str, Any]) -> str:
+    """Renders a text run with its bold, italic, code and link styles."""
+    content: str = run["content"]
+    stripped = content.strip()
+    if not stripped:
+        return content
+
+    text_style = run.get("textStyle", {})
+    if _is_monospace(run):
+        text = f"`{stripped}`"
+    else:
+        text = _MARKDOWN_ESCAPE_RE.sub(r"\\\1", stripped)
+        if text_style.get("bold") and text_style.get("italic"):
+            text = f"***{text}***"
+        elif text_style.get("bold"):
+            text = f"**{text}**"
+        elif text_style.get("italic"):
+            text = f"*{text}*"
+    url = text_style.get("link", {}).get("url")
+    if url:
+        text = f"[{text}]({url})"
+
+    # Emphasis markers must not enclose surrounding whitespace
+    leading = content[: len(content) - len(content.lstrip())]
+    trailing = content[len(content.rstrip()) :]
+    return f"{leading}{text}{trailing}"
+
+
+def _blocks_to_markdown(blocks: list[dict[str, Any]], lists: dict[str, Any]) -> str:
+    """Joins rendered blocks into a markdown document."""
+    parts: list[str] = []
+    previous: dict[str, Any] | None = None
+    # Empty paragraphs since the previous block; kept when inside a code block
+    blank_lines = 0
+    for block in blocks:
+        block_type = block["type"]
+        if block_type == "paragraph" and not block["text"].strip():
+            blank_lines += 1
+            continue
+
+        if block_type == "heading":
+            line = "#" * block["level"] + " " + block["text"]
+        elif block_type == "bullet":
+            nesting = block["nesting"]
+            ordered = _is_ordered_list(lists, block["list_id"], nesting)
+            line = "   " * nesting + ("1. " if ordered else "- ") + block["text"]
+        elif block_type == "quote":
+            line = "> " + block["text"]
+        else:
+            line = block["text"]
+
+        if block_type == "code":
+            if previous is not None and previous["type"] == "code":
+                separator = "\n" * (blank_lines + 1)
+                parts[-1] = parts[-1][: -len("\n```")] + separator + line + "\n```"
+            else:
+                parts.append("```\n" + line + "\n```")
+        elif (
+            block_type == "bullet"
+            and not blank_lines
+            and previous is not None
+            and previous["type"] == "bullet"
+            and previous["list_id"] == block["list_id"]
+        ):
+            parts[-1] += "\n" + line
+        else:
+            parts.append(line)
+        previous = block
+        blank_lines = 0
+
+    return "\n\n".join(parts) + "\n" if parts else ""
+
+
+def _is_ordered_list(lists: dict[str, Any], list_id: str, nesting: int) -> bool:
+    """Returns True if a list nesting level uses numbered glyphs."""
+    levels = lists.get(list_id, {}).get("listProperties", {}).get("nestingLevels", [])
+    if nesting >= len(levels):
+        return False
+    return levels[nesting].get("glyphType") in ORDERED_GLYPH_TYPES
+
+
+def _get_insert_index(doc: dict[str, Any]) -> int:
+    """Returns the index at which content is appended to a document."""
+    body = doc.get("body", {})
+    content_elements = body.get("content", [])
+    if content_elements:
+        end_index: int = content_elements[-1].get("endIndex", 1)
+        return end_index - 1
+    return 1
+
+
+def _write_markdown_journaled(service: Any, document_id: str, markdown_content: str) -> None:
+    """
+    Writes large markdown content in chunks, recording progress in a journal.
+
+    The journal holds the chunk plan, the content hash, the last acknowledged
+    chunk and the document revision after it. A retry with the same content
+    resumes from the first unacknowledged chunk. The journal is removed once
+    every chunk has been written.
+    """
+    content_hash = hashlib.sha256(markdown_content.encode("utf-8")).hexdigest()
+    journal_path = _journal_path(document_id, content_hash)
+
+    # Chunks are converted separately, so link references are resolved
+    # against the definitions of the whole content
+    env: dict[str, Any] = {}
+    planned_chunks = _split_markdown_chunks(markdown_content, JOURNAL_CHUNK_SIZE, env)
+    references = env.get("references", {})
+
+    doc = service.documents().get(documentId=document_id).execute()
+    insert_index = _get_insert_index(doc)
+
+    journal = _load_journal(journal_path)
+    if journal is None or journal.get("content_hash") != content_hash:
+        journal = {
+            "document_id": document_id,
+            "content_hash": content_hash,
+            "chunks": [
+                {
+                    "start": start,
+                    "end": end,
+                    "sha256": hashlib.sha256(
+                        markdown_content[start:end].encode("utf-8")
+                    ).hexdigest(),
+                }
+                for start, end in planned_chunks
+            ],
+            "last_acked_chunk": -1,
+            "revision_id": None,
+            "end_index": insert_index,
+        }
+        _save_journal(journal_path, journal)
+
+    chunks = journal["chunks"]
+    next_chunk = journal["last_acked_chunk"] + 1
+
+    # A chunk may have landed without being acknowledged (e.g. the worker died
+    # after batchUpdate returned). If the document grew by exactly that
+    # chunk's length since the last acknowledgement, treat it as written.
+    if next_chunk < len(chunks) and doc.get("revisionId") != journal["revision_id"]:
+        chunk = chunks[next_chunk]
+        requests = _markdown_to_docs_requests(
+            markdown_content[chunk["start"] : chunk["end"]], journal["end_index"], references
+        )
+        if insert_index == journal["end_index"] + _inserted_length(requests):
+            journal["last_acked_chunk"] = next_chunk
+            journal["revision_id"] = doc.get("revisionId")
+            journal["end_index"] = insert_index
+            _save_journal(journal_path, journal)
+            next_chunk += 1
+
+    for chunk_number in range(next_chunk, len(chunks)):
+        chunk = chunks[chunk_number]
+        requests = _markdown_to_docs_requests(
+            markdown_content[chunk["start"] : chunk["end"]], insert_index, references
+        )
+        revision_id = journal["revision_id"]
+        if requests:
+            response = service.documents().batchUpdate(
+                documentId=document_id, body={"requests": requests}
+            ).execute()
+            revision_id = (response or {}).get("writeControl", {}).get("requiredRevisionId")
+        insert_index += _inserted_length(requests)
+
+        journal["last_acked_chunk"] = chunk_number
+        journal["revision_id"] = revision_id
+        journal["end_index"] = insert_index
+        _save_journal(journal_path, journal)
+
+    os.remove(journal_path)
+
+
+def _split_markdown_chunks(
+    markdown_content: str, max_chars: int, env: dict[str, Any] | None = None
+) -> list[tuple[int, int]]:
+    """
+    Splits markdown into (start, end) character ranges at top-level block
+    boundaries, so that no chunk starts inside a list, fence or blockquote.
+
+    Chunks are at most max_chars long unless a single block is larger. If env
+    is given, it receives the content's link reference definitions under
+    "references", for converting the chunks separately.
+    """
+    line_offsets = [0]
+    for line in markdown_content.split("\n"):
+        line_offsets.append(line_offsets[-1] + len(line) + 1)
+
+    md = MarkdownIt("commonmark")
+    boundaries = [
+        line_offsets[token.map[0]]
+        for token in md.parse(markdown_content, env)
+        if token.level == 0 and token.nesting != -1 and token.map
+    ]
+
+    chunks: list[tuple[int, int]] = []
+    start = 0
+    previous = 0
+    for boundary in boundaries + [len(markdown_content)]:
+        if boundary - start > max_chars and previous > start:
+            chunks.append((start, previous))
+            start = previous
+        previous = boundary
+    if start < len(markdown_content):
+        chunks.append((start, len(markdown_content)))
+    return chunks
+
+
+def _inserted_length(requests: list[dict[str, Any]]) -> int:
+    """Returns the number of characters inserted by a list of requests."""
+    return sum(len(r["insertText"]["text"]) for r in requests if "insertText" in r)
+
+
+def _journal_path(document_id: str, write_key: str) -> str:
+    """Returns the journal file path for a document and a content hash or write ID."""
+    journal_dir = os.environ.get(JOURNAL_DIR_ENV_VAR, DEFAULT_JOURNAL_DIR)
+    return os.path.join(journal_dir, f"{document_id}-{write_key[:16]}.json")
+
+
+def _load_journal(journal_path: str) -> dict[str, Any] | None:
+    """Loads a write journal, returning None if it is missing or unreadable."""
+    try:
+        with open(journal_path) as f:
+            journal: dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return journal
+
+
+def _save_journal(journal_path: str, journal: dict[str, Any]) -> None:
+    """Atomically writes a write journal."""
+    os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+    tmp_path = f"{journal_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(journal, f)
+    os.replace(tmp_path, journal_path)
+
+
+def _markdown_to_docs_requests(
+    markdown_content: str, start_index: int, references: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
     """
     Converts markdown content to Google Docs API batch update requests.
 
     Args:
         markdown_content: Markdown formatted string
         start_index: Starting index in the document
+        references: Link reference definitions from outside markdown_content,
+            as collected by markdown-it; definitions in the content itself
+            do not override them
 
     Returns:
         List of batch update request dictionaries
@@ -122,7 +921,7 @@ def _markdown_to_docs_requests(markdown_content: str, start_index: int) -> list[
 
     # Parse markdown
     md = MarkdownIt("commonmark")
-    tokens = md.parse(markdown_content)
+    tokens = md.parse(markdown_content, {"references": dict(references or {})})
 
     i = 0
     while i < len(tokens):
@@ -519,18 +1318,5 @@ def _create_formatting_requests(
 
 
 def _get_credentials() -> Any:
-    """Gets the user's credentials."""
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "credentials.json", SCOPES
-            )
-            creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return creds
+    """Gets the user's credentials from the shared credential provider."""
+    return get_credential_provider(SCOPES).get()
@@ -1,6 +1,7 @@
 """Workflows package for agent orchestration using Prefect."""
 
 from .pipeline import agent_workflow
+from .replay import replay_workflow
 
-__all__ = ["agent_workflow"]
+__all__ = ["agent_workflow", "replay_workflow"]
 
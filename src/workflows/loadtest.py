@@ -0,0 +1,534 @@
+"""End-to-end load generator for agent_workflow and the doc_agent.
+
+Runs SOW sessions at increasing concurrency levels against either the
+agent_workflow Prefect flow or the doc_agent (driven through an in-process
+ADK runner, the same agent stack ``adk api_server`` serves). The LLM is
+replaced by a stub that emits tokens at a configurable rate, and Google Docs
+by an in-memory stand-in with a configurable per-call latency, so results
+reflect this codebase rather than external services.
+
+For each level it reports throughput, p50/p95/p99 end-to-end latency, the
+mean time per stage, and the peak RSS sampled while the level ran, then names
+the saturation point: the first level whose p95 latency exceeds
+SATURATION_FACTOR times the p95 of the lowest level.
+
+Run with: python -m workflows.loadtest --target agent --concurrency 1,2,4,8
+"""
+
+import argparse
+import asyncio
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import math
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from collections.abc import AsyncGenerator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from types import TracebackType
+from typing import Any, Self
+
+from google.adk.agents import Agent
+from google.adk.models import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from agents.doc_agent import agent as doc_agent
+from agents.doc_agent.tools import google_docs_tool
+from workflows import pipeline
+
+logger = logging.getLogger(__name__)
+
+# A level is saturated once its p95 exceeds this multiple of the baseline p95
+SATURATION_FACTOR = 1.5
+STAGES = ("llm", "create_document", "write_document")
+# Seconds between RSS samples while a level runs
+RSS_SAMPLE_INTERVAL = 0.05
+
+# Stage durations for the session running in the current context
+_stage_times: contextvars.ContextVar[dict[str, float] | None] = contextvars.ContextVar(
+    "loadtest_stage_times", default=None
+)
+
+
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    """Adds the duration of the block to the current session's stage time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        times = _stage_times.get()
+        if times is not None:
+            times[name] = times.get(name, 0.0) + time.perf_counter() - started
+
+
+def _timed[**P, R](name: str, fn: Callable[P, R]) -> Callable[P, R]:
+    """Wraps fn so that its duration is recorded as stage name."""
+
+    @functools.wraps(fn)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        with _stage(name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class LocalDocsService:
+    """In-memory stand-in for the Google Docs API service object."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self._end_indexes: dict[str, int] = {}
+        self._revisions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def documents(self) -> "LocalDocsService":
+        return self
+
+    def create(self, body: dict[str, Any]) -> "_LocalCall":
+        def create() -> dict[str, Any]:
+            document_id = uuid.uuid4().hex
+            with self._lock:
+                self._end_indexes[document_id] = 2
+                self._revisions[document_id] = 1
+            return {"documentId": document_id, "title": body.get("title")}
+
+        return _LocalCall(create, self.latency)
+
+    def get(self, documentId: str, fields: str | None = None) -> "_LocalCall":
+        def get() -> dict[str, Any]:
+            with self._lock:
+                return {
+                    "documentId": documentId,
+                    "revisionId": str(self._revisions[documentId]),
+                    "body": {"content": [{"endIndex": self._end_indexes[documentId]}]},
+                }
+
+        return _LocalCall(get, self.latency)
+
+    def batchUpdate(self, documentId: str, body: dict[str, Any]) -> "_LocalCall":
+        def batch_update() -> dict[str, Any]:
+            inserted = sum(
+                len(r["insertText"]["text"]) for r in body["requests"] if "insertText" in r
+            )
+            with self._lock:
+                self._end_indexes[documentId] += inserted
+                self._revisions[documentId] += 1
+                revision = str(self._revisions[documentId])
+            return {"documentId": documentId, "writeControl": {"requiredRevisionId": revision}}
+
+        return _LocalCall(batch_update, self.latency)
+
+
+class _LocalCall:
+    """A pending LocalDocsService call, completed by execute()."""
+
+    def __init__(self, fn: Callable[[], dict[str, Any]], latency: float) -> None:
+        self._fn = fn
+        self._latency = latency
+
+    def execute(self) -> dict[str, Any]:
+        time.sleep(self._latency)
+        return self._fn()
+
+
+class StubLlm(BaseLlm):
+    """
+    LLM stand-in that emits tokens at a fixed rate.
+
+    Each session creates a document, writes output_tokens of generated
+    markdown to it and replies with a short confirmation, i.e. three model
+    calls and two tool calls.
+    """
+
+    model: str = "stub"
+    tokens_per_second: float = 200.0
+    output_tokens: int = 500
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse]:
+        response = _last_function_response(llm_request)
+        if response is None:
+            part = types.Part.from_function_call(
+                name="create_document", args={"title": "Load test SOW"}
+            )
+            tokens = 20
+        elif response.name == "create_document":
+            document_id = (response.response or {}).get("document_id", "")
+            part = types.Part.from_function_call(
+                name="write_markdown_to_document",
+                args={
+                    "document_id": document_id,
+                    "markdown_content": generate_markdown(self.output_tokens),
+                },
+            )
+            tokens = self.output_tokens
+        else:
+            part = types.Part.from_text(text="The statement of work has been written.")
+            tokens = 10
+
+        with _stage("llm"):
+            await asyncio.sleep(tokens / self.tokens_per_second)
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def _last_function_response(llm_request: LlmRequest) -> types.FunctionResponse | None:
+    """Returns the function response in the latest request content, if any."""
+    if not llm_request.contents:
+        return None
+    for part in llm_request.contents[-1].parts or []:
+        if part.function_response is not None:
+            return part.function_response
+    return None
+
+
+def generate_markdown(tokens: int) -> str:
+    """Generates SOW-like markdown of roughly the given number of words."""
+    sections = []
+    words = 0
+    for number in itertools.count(1):
+        if words >= tokens:
+            break
+        sections.append(
+            f"## Deliverable {number}\n\n"
+            f"The vendor will deliver **milestone {number}** as described in the "
+            f"*project plan*, including documentation and a "
+            f"[handover](https://example.com/{number}).\n\n"
+            "- Requirements review\n- Implementation\n- Acceptance testing\n"
+        )
+        words += 30
+    return "# Statement of Work\n\n" + "\n".join(sections)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Returns the nearest-rank percentile of values."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def process_peak_rss_mb() -> float:
+    """Returns the peak resident set size over the life of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> float | None:
+    """Returns the current resident set size of this process in MiB, if available."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """
+    Samples the resident set size in a background thread while in use.
+
+    Unlike ru_maxrss, which only ever grows, the peak covers just the sampled
+    period. peak_mb is NaN where the current RSS cannot be read.
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.peak_mb = math.nan
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loadtest-rss", daemon=True)
+
+    def __enter__(self) -> Self:
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        rss = current_rss_mb()
+        if rss is not None and (math.isnan(self.peak_mb) or rss > self.peak_mb):
+            self.peak_mb = rss
+
+
+@contextmanager
+def _patched(obj: Any, name: str, value: Any) -> Iterator[None]:
+    """Temporarily replaces an attribute of obj."""
+    original = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, original)
+
+
+@contextmanager
+def stubbed_services(
+    docs_latency: float, tokens_per_second: float, output_tokens: int
+) -> Iterator[None]:
+    """Replaces Google Docs and the LLM with local stand-ins and adds stage timers."""
+    service = LocalDocsService(docs_latency)
+
+    def generate_content(prompt: str) -> str:
+        with _stage("llm"):
+            time.sleep(output_tokens / tokens_per_second)
+        return generate_markdown(output_tokens)
+
+    with ExitStack() as stack:
+        stack.enter_context(_patched(google_docs_tool, "build", lambda *a, **k: service))
+        stack.enter_context(_patched(google_docs_tool, "_get_credentials", lambda: None))
+        # Agent tools call through the google_docs_tool module
+        for name, stage in (
+            ("create_document", "create_document"),
+            ("write_batch_to_document", "write_document"),
+        ):
+            stack.enter_context(
+                _patched(google_docs_tool, name, _timed(stage, getattr(google_docs_tool, name)))
+            )
+        # The pipeline imported its Docs functions by name
+        for name, stage in (
+            ("create_document", "create_document"),
+            ("write_markdown_to_document", "write_document"),
+            ("write_to_document", "write_document"),
+        ):
+            stack.enter_context(_patched(pipeline, name, _timed(stage, getattr(pipeline, name))))
+        stack.enter_context(_patched(pipeline.generate_sow_content, "fn", generate_content))
+        yield
+
+
+def agent_session_runner(tokens_per_second: float, output_tokens: int) -> Callable[[int], None]:
+    """Returns a function that runs one doc_agent session to completion."""
+    root_agent = doc_agent.root_agent
+    agent = Agent(
+        model=StubLlm(tokens_per_second=tokens_per_second, output_tokens=output_tokens),
+        name=root_agent.name,
+        description=root_agent.description,
+        instruction=root_agent.instruction,
+        tools=root_agent.tools,
+        after_agent_callback=root_agent.after_agent_callback,
+    )
+    runner = InMemoryRunner(agent=agent, app_name="loadtest")
+
+    def run_session(index: int) -> None:
+        async def session() -> None:
+            created = await runner.session_service.create_session(
+                app_name=runner.app_name, user_id="loadtest"
+            )
+            message = types.Content(
+                role="user", parts=[types.Part.from_text(text=f"Write SOW number {index}")]
+            )
+            async for _ in runner.run_async(
+                user_id="loadtest", session_id=created.id, new_message=message
+            ):
+                pass
+
+        asyncio.run(session())
+
+    return run_session
+
+
+def flow_session_runner() -> Callable[[int], None]:
+    """Returns a function that runs one agent_workflow flow to completion."""
+
+    def run_session(index: int) -> None:
+        pipeline.agent_workflow(
+            sow_title=f"Load test SOW {index}",
+            sow_prompt=f"Generate statement of work number {index}",
+        )
+
+    return run_session
+
+
+def run_level(
+    run_session: Callable[[int], None],
+    sessions: int,
+    concurrency: int,
+    arrival_rate: float | None,
+) -> dict[str, Any]:
+    """
+    Runs sessions at one concurrency level and summarizes the results.
+
+    With an arrival rate, sessions are started on a fixed schedule (open
+    loop) and latency includes time spent queued for a worker; otherwise
+    each worker starts a new session as soon as its last one finishes.
+    """
+
+    errors: list[str] = []
+
+    def job(index: int, submitted: float) -> tuple[float, dict[str, float]] | None:
+        if not arrival_rate:
+            # Closed loop: queued sessions have not "arrived" yet
+            submitted = time.perf_counter()
+        times: dict[str, float] = {}
+        token = _stage_times.set(times)
+        try:
+            run_session(index)
+        except Exception as e:
+            logger.debug("Session %d failed", index, exc_info=True)
+            errors.append(f"{type(e).__name__}: {e}")
+            return None
+        finally:
+            _stage_times.reset(token)
+        return time.perf_counter() - submitted, times
+
+    started = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for index in range(sessions):
+            if arrival_rate:
+                delay = started + index / arrival_rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(job, index, time.perf_counter()))
+        results = [future.result() for future in futures]
+    wall_time = time.perf_counter() - started
+
+    completed = [result for result in results if result is not None]
+    latencies = [latency for latency, _ in completed]
+    stage_means = {
+        stage: sum(times.get(stage, 0.0) for _, times in completed) / max(len(completed), 1)
+        for stage in STAGES
+    }
+    stage_means["other"] = max(
+        sum(latencies) / max(len(completed), 1) - sum(stage_means.values()), 0.0
+    )
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "errors": sessions - len(completed),
+        "throughput_per_min": len(completed) / wall_time * 60 if wall_time else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "stages": stage_means,
+        "peak_rss_mb": rss.peak_mb,
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def find_saturation(levels: list[dict[str, Any]]) -> int | None:
+    """
+    Returns the lowest concurrency whose p95 exceeds SATURATION_FACTOR times
+    the p95 of the lowest tested concurrency.
+    """
+    if not levels:
+        return None
+    baseline, *rest = sorted(levels, key=lambda level: level["concurrency"])
+    for level in rest:
+        if level["p95"] > baseline["p95"] * SATURATION_FACTOR:
+            return int(level["concurrency"])
+    return None
+
+
+def format_report(
+    target: str, levels: list[dict[str, Any]], saturation: int | None, process_peak_rss: float
+) -> str:
+    """Renders load test results as a text table."""
+    header = (
+        f"{'conc':>5} {'ok':>5} {'err':>4} {'SOW/min':>9} {'p50 s':>8} {'p95 s':>8} "
+        f"{'p99 s':>8} " + " ".join(f"{stage[:12]:>12}" for stage in (*STAGES, "other"))
+        + f" {'RSS MiB':>8}"
+    )
+    lines = [f"Load test: {target}", header]
+    for level in levels:
+        stages = level["stages"]
+        lines.append(
+            f"{level['concurrency']:>5} {level['sessions'] - level['errors']:>5} "
+            f"{level['errors']:>4} {level['throughput_per_min']:>9.1f} {level['p50']:>8.3f} "
+            f"{level['p95']:>8.3f} {level['p99']:>8.3f} "
+            + " ".join(f"{stages[stage]:>12.3f}" for stage in (*STAGES, "other"))
+            + f" {level['peak_rss_mb']:>8.1f}"
+        )
+    for level in levels:
+        if level["first_error"]:
+            lines.append(f"Concurrency {level['concurrency']} error: {level['first_error']}")
+    lines.append(f"Process peak RSS (all levels and warmup): {process_peak_rss:.1f} MiB")
+    if saturation is None:
+        lines.append("Saturation not reached at the tested concurrency levels")
+    else:
+        baseline = min(level["concurrency"] for level in levels)
+        lines.append(
+            f"Saturation at concurrency {saturation} "
+            f"(p95 above {SATURATION_FACTOR}x the concurrency {baseline} p95)"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=("agent", "flow"), default="agent")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per concurrency level")
+    parser.add_argument(
+        "--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels"
+    )
+    parser.add_argument(
+        "--arrival-rate", type=float, default=None, help="Sessions started per second (open loop)"
+    )
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--output-tokens", type=int, default=500)
+    parser.add_argument(
+        "--docs-latency", type=float, default=0.05, help="Seconds per Docs API call"
+    )
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured sessions to run first")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+    with stubbed_services(args.docs_latency, args.tokens_per_second, args.output_tokens):
+        if args.target == "agent":
+            run_session = agent_session_runner(args.tokens_per_second, args.output_tokens)
+        else:
+            run_session = flow_session_runner()
+
+        for index in range(args.warmup):
+            run_session(-1 - index)
+
+        levels = [
+            run_level(run_session, args.sessions, concurrency, args.arrival_rate)
+            for concurrency in concurrency_levels
+        ]
+
+    saturation = find_saturation(levels)
+    process_peak_rss = process_peak_rss_mb()
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "target": args.target,
+                    "levels": levels,
+                    "saturation": saturation,
+                    "process_peak_rss_mb": process_peak_rss,
+                }
+            )
+        )
+    else:
+        print(format_report(args.target, levels, saturation, process_peak_rss))
+
+
+if __name__ == "__main__":
+    main()
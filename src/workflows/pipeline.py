@@ -4,20 +4,24 @@ from typing import Any
 
 from prefect import flow, task
 
-from agents.sow_agent.tools.google_docs_tool import (
+from agents.doc_agent.tools.google_docs_tool import (
     create_document,
+    render_document_requests,
     write_markdown_to_document,
     write_to_document,
 )
+from workflows.profiling import profile_task
 
 
 @task
+@profile_task
 def create_sow_document(title: str) -> str:
     """Task to create a new SOW document."""
     return create_document(title)
 
 
 @task
+@profile_task
 def generate_sow_content(prompt: str) -> str:
     """Task to generate SOW content using the SOW agent."""
     # TODO: Integrate with SOW agent when agent execution is needed
@@ -26,9 +30,14 @@ def generate_sow_content(prompt: str) -> str:
 
 
 @task
-def write_content_to_document(document_id: str, content: str, use_markdown: bool = True) -> None:
-    """Task to write content to a Google Doc."""
-    if use_markdown:
+@profile_task
+def write_content_to_document(
+    document_id: str, content: str, use_markdown: bool = True, render_path: str | None = None
+) -> None:
+    """Task to write content to a Google Doc, or render its requests to a file."""
+    if render_path is not None:
+        render_document_requests(document_id, content, render_path, is_markdown=use_markdown)
+    elif use_markdown:
         write_markdown_to_document(document_id, content)
     else:
         write_to_document(document_id, content)
@@ -39,6 +48,8 @@ def agent_workflow(
     sow_title: str = "Statement of Work",
     sow_prompt: str = "Generate a statement of work document",
     use_markdown: bool = True,
+    profile: bool | None = None,
+    render_path: str | None = None,
 ) -> dict[str, Any]:
     """
     Main workflow for orchestrating agent tasks.
@@ -51,6 +62,12 @@ def agent_workflow(
     Args:
         sow_title: Title for the SOW document
         sow_prompt: Prompt for generating SOW content
+        profile: Capture cProfile and tracemalloc summaries for each task and
+            publish them as flow-run artifacts; None defers to the
+            AGENT_WORKFLOW_PROFILE environment variable
+        render_path: If given, append the converted batchUpdate bodies to this
+            JSON-lines file instead of sending them; send them later with the
+            replay_workflow flow
 
     Returns:
         Dictionary containing the document ID and status
@@ -62,11 +79,13 @@ def agent_workflow(
     content = generate_sow_content(sow_prompt)
 
     # Step 3: Write content to document (with markdown support)
-    write_content_to_document(document_id, content, use_markdown=use_markdown)
+    write_content_to_document(
+        document_id, content, use_markdown=use_markdown, render_path=render_path
+    )
 
     return {
         "document_id": document_id,
-        "status": "completed",
+        "status": "rendered" if render_path is not None else "completed",
         "title": sow_title,
     }
 
@@ -0,0 +1,173 @@
+"""Opt-in CPU and memory profiling for Prefect tasks.
+
+Profiling is switched on per flow run, either by passing ``profile=True`` to
+the flow or by setting the ``AGENT_WORKFLOW_PROFILE`` environment variable.
+When enabled, each task wrapped with :func:`profile_task` is run under
+cProfile and tracemalloc, and a summary is published as a flow-run artifact.
+The raw cProfile statistics are written to ``AGENT_WORKFLOW_PROFILE_DIR``
+(default ``profiles/``) so they can be loaded with ``pstats`` or snakeviz.
+"""
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+from prefect.artifacts import create_markdown_artifact
+from prefect.runtime import flow_run
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV_VAR = "AGENT_WORKFLOW_PROFILE"
+PROFILE_DIR_ENV_VAR = "AGENT_WORKFLOW_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Number of rows included in the artifact summaries
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+# Held while a task is being profiled
+_profile_lock = threading.Lock()
+
+
+def profiling_enabled() -> bool:
+    """
+    Returns True if profiling is enabled for the current flow run.
+
+    The flow run's ``profile`` parameter takes precedence; the environment
+    variable is used when the parameter is absent or None.
+    """
+    parameters = flow_run.parameters or {}
+    if parameters.get("profile") is not None:
+        return bool(parameters["profile"])
+    return os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+
+def profile_task[**P, R](fn: Callable[P, R]) -> Callable[P, R]:
+    """
+    Decorator that profiles a task function when profiling is enabled.
+
+    Apply it beneath ``@task`` so that the profile covers the task body only:
+
+        @task
+        @profile_task
+        def my_task(...): ...
+
+    cProfile and tracemalloc are process-wide, so only one task per process
+    is profiled at a time; tasks that start while another profile is active
+    run unprofiled.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if not profiling_enabled():
+            return fn(*args, **kwargs)
+        if not _profile_lock.acquire(blocking=False):
+            logger.info("Skipping profile of %s: another task is being profiled", fn.__name__)
+            return fn(*args, **kwargs)
+
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.take_snapshot()
+
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - started
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+                try:
+                    _publish_profile(fn.__name__, profiler, baseline, snapshot, peak, elapsed)
+                except Exception:
+                    logger.warning("Failed to publish profile for %s", fn.__name__, exc_info=True)
+        finally:
+            _profile_lock.release()
+
+    return wrapper
+
+
+def _publish_profile(
+    task_name: str,
+    profiler: cProfile.Profile,
+    baseline: tracemalloc.Snapshot,
+    snapshot: tracemalloc.Snapshot,
+    peak_bytes: int,
+    elapsed: float,
+) -> None:
+    """Save the raw profile and publish a markdown summary artifact."""
+    run_id = flow_run.id or "local"
+    profile_dir = Path(os.environ.get(PROFILE_DIR_ENV_VAR, DEFAULT_PROFILE_DIR))
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    raw_path = profile_dir / f"{run_id}-{task_name}.prof"
+    profiler.dump_stats(str(raw_path))
+
+    markdown = _format_summary(task_name, profiler, baseline, snapshot, peak_bytes, elapsed)
+    markdown += f"\n\nRaw profile: `{raw_path.resolve()}`\n"
+
+    create_markdown_artifact(
+        key=_artifact_key(f"profile-{task_name}"),
+        markdown=markdown,
+        description=f"CPU and memory profile for task {task_name}",
+    )
+
+
+def _format_summary(
+    task_name: str,
+    profiler: cProfile.Profile,
+    baseline: tracemalloc.Snapshot,
+    snapshot: tracemalloc.Snapshot,
+    peak_bytes: int,
+    elapsed: float,
+) -> str:
+    """Render cProfile and tracemalloc results as a markdown report."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+
+    lines = [
+        f"# Profile: {task_name}",
+        "",
+        f"- Wall time: {elapsed:.3f}s",
+        f"- Peak traced memory: {peak_bytes / 1024:.1f} KiB",
+        "",
+        f"## Top {TOP_FUNCTIONS} functions by cumulative time",
+        "",
+        "```",
+        stream.getvalue().strip(),
+        "```",
+        "",
+        f"## Top {TOP_ALLOCATIONS} allocations",
+        "",
+        "| Location | Size (KiB) | Delta (KiB) | Count |",
+        "| --- | --- | --- | --- |",
+    ]
+    for stat in snapshot.compare_to(baseline, "lineno")[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"| `{frame.filename}:{frame.lineno}` | {stat.size / 1024:.1f} "
+            f"| {stat.size_diff / 1024:+.1f} | {stat.count} |"
+        )
+    return "\n".join(lines)
+
+
+def _artifact_key(name: str) -> str:
+    """Artifact keys may only contain lowercase letters, numbers and dashes."""
+    return re.sub(r"[^a-z0-9-]+", "-", name.lower()).strip("-")
+
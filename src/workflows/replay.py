@@ -0,0 +1,48 @@
+"""Prefect flow for replaying rendered Google Docs requests.
+
+agent_workflow (and write_markdown_to_document) can render batchUpdate bodies
+to JSON-lines files instead of sending them. This flow streams those files
+and sends the requests with bounded concurrency, e.g. during a quota-friendly
+window. Acknowledged chunks are journaled, so rerunning the same files after
+a failure resumes where the previous run stopped.
+
+Run directly with: python -m workflows.replay rendered.jsonl [more.jsonl ...]
+"""
+
+import argparse
+from typing import Any
+
+from prefect import flow
+
+from agents.doc_agent.tools.google_docs_tool import replay_rendered_requests
+
+
+@flow(name="replay_workflow", log_prints=True)
+def replay_workflow(paths: list[str], max_concurrency: int = 4) -> dict[str, Any]:
+    """
+    Sends the requests recorded in rendered JSON-lines files.
+
+    Args:
+        paths: JSON-lines files written in render mode, replayed in order
+        max_concurrency: Maximum number of documents written concurrently
+
+    Returns:
+        Dictionary with the number of documents, chunks and requests sent and
+        the number of chunks skipped as already acknowledged
+    """
+    stats = replay_rendered_requests(paths, max_concurrency=max_concurrency)
+    print(
+        f"Replayed {stats['chunks']} chunk(s) ({stats['requests']} requests) "
+        f"to {stats['documents']} document write(s), skipping "
+        f"{stats['skipped_chunks']} already acknowledged chunk(s)"
+    )
+    return {**stats, "status": "completed"}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="Rendered JSON-lines files")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    args = parser.parse_args()
+    result = replay_workflow(args.paths, max_concurrency=args.max_concurrency)
+    print(f"Replay completed: {result}")
@@ -11,10 +11,11 @@ To add new flows:
 
 # Import all flows to register them
 from workflows.pipeline import agent_workflow  # noqa: F401
+from workflows.replay import replay_workflow  # noqa: F401
 
 # This makes flows discoverable when running `prefect flow serve`
 # Add new flows here as you create them
-__all__ = ["agent_workflow"]
+__all__ = ["agent_workflow", "replay_workflow"]
 
 # Ensure flows are available at module level for discovery
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from agents.doc_agent.tools import buffered_docs_tools
+from agents.doc_agent.tools.buffered_docs_tools import (
+    RESULTS_STATE_KEY,
+    flush_buffered_writes,
+    read_document_as_markdown,
+    write_markdown_to_document,
+    write_to_document,
+)
+
+
+class TestBufferedDocsTools(unittest.TestCase):
+    def setUp(self):
+        buffered_docs_tools._buffers.clear()
+        buffered_docs_tools._results.clear()
+        buffered_docs_tools._last_active.clear()
+        self.tool_context = MagicMock(invocation_id="invocation-1")
+
+    @patch("agents.doc_agent.tools.google_docs_tool.write_batch_to_document")
+    def test_writes_are_flushed_once_per_document_at_end_of_turn(self, mock_write_batch):
+        write_markdown_to_document("doc-a", "# One", self.tool_context)
+        write_to_document("doc-b", "plain", self.tool_context)
+        result = write_markdown_to_document("doc-a", "## Two", self.tool_context)
+
+        self.assertEqual(result["status"], "buffered")
+        self.assertEqual(result["pending_writes"], 2)
+        mock_write_batch.assert_not_called()
+
+        callback_context = MagicMock(invocation_id="invocation-1", state={})
+        flush_buffered_writes(callback_context)
+
+        self.assertEqual(mock_write_batch.call_count, 2)
+        mock_write_batch.assert_any_call("doc-a", [("# One", True), ("## Two", True)])
+        mock_write_batch.assert_any_call("doc-b", [("plain", False)])
+        self.assertEqual(
+            [r["writes"] for r in callback_context.state[RESULTS_STATE_KEY]], [2, 1]
+        )
+        self.assertEqual(buffered_docs_tools._buffers, {})
+
+    @patch("agents.doc_agent.tools.buffered_docs_tools.MAX_BUFFERED_WRITES", 2)
+    @patch("agents.doc_agent.tools.google_docs_tool.write_batch_to_document")
+    def test_full_buffer_is_flushed_immediately(self, mock_write_batch):
+        write_to_document("doc-a", "one", self.tool_context)
+        result = write_to_document("doc-a", "two", self.tool_context)
+
+        self.assertEqual(result, {"status": "success", "document_id": "doc-a", "writes": 2})
+        mock_write_batch.assert_called_once_with("doc-a", [("one", False), ("two", False)])
+
+        # The early flush is reported alongside the end-of-turn flush
+        write_to_document("doc-a", "three", self.tool_context)
+        callback_context = MagicMock(invocation_id="invocation-1", state={})
+        flush_buffered_writes(callback_context)
+
+        self.assertEqual(
+            [r["writes"] for r in callback_context.state[RESULTS_STATE_KEY]], [2, 1]
+        )
+
+    @patch("agents.doc_agent.tools.google_docs_tool.read_document_as_markdown")
+    @patch("agents.doc_agent.tools.google_docs_tool.write_batch_to_document")
+    def test_read_flushes_pending_writes_first(self, mock_write_batch, mock_read):
+        mock_read.return_value = "# One\n"
+        write_markdown_to_document("doc-a", "# One", self.tool_context)
+
+        result = read_document_as_markdown("doc-a", self.tool_context)
+
+        mock_write_batch.assert_called_once_with("doc-a", [("# One", True)])
+        self.assertEqual(result, {"status": "success", "markdown": "# One\n"})
+
+    @patch("agents.doc_agent.tools.google_docs_tool.read_document_as_markdown")
+    def test_read_reports_failed_read(self, mock_read):
+        mock_read.side_effect = RuntimeError("document not found")
+
+        with self.assertLogs(buffered_docs_tools.logger, level="WARNING"):
+            result = read_document_as_markdown("doc-a", self.tool_context)
+
+        self.assertEqual(
+            result, {"status": "error", "document_id": "doc-a", "error": "document not found"}
+        )
+
+    @patch("agents.doc_agent.tools.google_docs_tool.read_document_as_markdown")
+    @patch("agents.doc_agent.tools.google_docs_tool.write_batch_to_document")
+    def test_read_reports_failed_flush(self, mock_write_batch, mock_read):
+        mock_write_batch.side_effect = RuntimeError("quota exceeded")
+        write_markdown_to_document("doc-a", "# One", self.tool_context)
+
+        with self.assertLogs(buffered_docs_tools.logger, level="WARNING"):
+            result = read_document_as_markdown("doc-a", self.tool_context)
+
+        self.assertEqual(result["status"], "error")
+        self.assertIn("quota exceeded", result["error"])
+        mock_read.assert_not_called()
+
+        callback_context = MagicMock(invocation_id="invocation-1", state={})
+        flush_buffered_writes(callback_context)
+        [flushed] = callback_context.state[RESULTS_STATE_KEY]
+        self.assertEqual(flushed["status"], "error")
+
+    @patch("agents.doc_agent.tools.google_docs_tool.write_batch_to_document")
+    def test_failed_flush_is_reported_in_state(self, mock_write_batch):
+        mock_write_batch.side_effect = RuntimeError("quota exceeded")
+        write_to_document("doc-a", "text", self.tool_context)
+
+        callback_context = MagicMock(invocation_id="invocation-1", state={})
+        with self.assertLogs(buffered_docs_tools.logger, level="WARNING"):
+            flush_buffered_writes(callback_context)
+
+        [result] = callback_context.state[RESULTS_STATE_KEY]
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["error"], "quota exceeded")
+
+    @patch("agents.doc_agent.tools.buffered_docs_tools.time.monotonic")
+    def test_buffers_of_abandoned_invocations_are_dropped(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        write_to_document("doc-a", "never flushed", self.tool_context)
+
+        mock_monotonic.return_value = buffered_docs_tools.STALE_BUFFER_SECONDS + 1
+        with self.assertLogs(buffered_docs_tools.logger, level="WARNING"):
+            write_to_document("doc-a", "text", MagicMock(invocation_id="invocation-2"))
+
+        self.assertEqual(list(buffered_docs_tools._buffers), ["invocation-2"])
+        self.assertEqual(list(buffered_docs_tools._last_active), ["invocation-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from agents.doc_agent.tools.google_credentials import (
+    CredentialProvider,
+    CredentialsUnavailableError,
+)
+
+SCOPES = ["https://www.googleapis.com/auth/documents"]
+
+
+def _write_token(path, expiry):
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "token": "access-token",
+                "refresh_token": "refresh-token",
+                "client_id": "client-id",
+                "client_secret": "client-secret",
+                "scopes": SCOPES,
+                "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            },
+            f,
+        )
+
+
+class TestCredentialProvider(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.token_path = os.path.join(self.tmp_dir.name, "token.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _provider(self, interactive=False, **kwargs):
+        provider = CredentialProvider(
+            token_path=self.token_path,
+            client_secrets_path=os.path.join(self.tmp_dir.name, "credentials.json"),
+            scopes=SCOPES,
+            interactive=interactive,
+            **kwargs,
+        )
+        self.addCleanup(provider.stop)
+        return provider
+
+    @patch("agents.doc_agent.tools.google_credentials.InstalledAppFlow")
+    def test_fails_fast_without_token_when_non_interactive(self, mock_flow):
+        provider = self._provider(interactive=False)
+
+        with self.assertRaises(CredentialsUnavailableError):
+            provider.get()
+
+        mock_flow.from_client_secrets_file.assert_not_called()
+
+    @patch("agents.doc_agent.tools.google_credentials.Credentials.refresh")
+    def test_uses_fresh_shared_token_without_refreshing(self, mock_refresh):
+        now = datetime.datetime.now(datetime.UTC)
+        _write_token(self.token_path, now + datetime.timedelta(hours=1))
+        provider = self._provider()
+
+        creds = provider.get()
+
+        self.assertEqual(creds.token, "access-token")
+        self.assertIs(provider.get(), creds)
+        mock_refresh.assert_not_called()
+
+    @patch(
+        "agents.doc_agent.tools.google_credentials.Credentials.refresh", autospec=True
+    )
+    def test_refreshes_expiring_token_and_replaces_file(self, mock_refresh):
+        now = datetime.datetime.now(datetime.UTC)
+        _write_token(self.token_path, now - datetime.timedelta(minutes=1))
+
+        def refresh(creds, request):
+            creds.token = "new-access-token"
+            creds.expiry = (now + datetime.timedelta(hours=1)).replace(tzinfo=None)
+
+        mock_refresh.side_effect = refresh
+        provider = self._provider()
+
+        creds = provider.get()
+
+        self.assertEqual(creds.token, "new-access-token")
+        mock_refresh.assert_called_once()
+        with open(self.token_path) as f:
+            self.assertEqual(json.load(f)["token"], "new-access-token")
+        self.assertEqual(
+            [name for name in os.listdir(self.tmp_dir.name) if name.endswith(".tmp")], []
+        )
+
+
+    @patch("agents.doc_agent.tools.google_credentials.Credentials.refresh")
+    def test_adopts_token_refreshed_by_another_process(self, mock_refresh):
+        now = datetime.datetime.now(datetime.UTC)
+        _write_token(self.token_path, now + datetime.timedelta(hours=1))
+        provider = self._provider()
+        creds = provider.get()
+
+        # The cached token expires and another worker has already replaced the file
+        creds.expiry = (now - datetime.timedelta(minutes=1)).replace(tzinfo=None)
+        with open(self.token_path) as f:
+            token = json.load(f)
+        token["token"] = "other-process-token"
+        with open(self.token_path, "w") as f:
+            json.dump(token, f)
+
+        self.assertEqual(provider.get().token, "other-process-token")
+        mock_refresh.assert_not_called()
+
+    @patch(
+        "agents.doc_agent.tools.google_credentials.Credentials.refresh", autospec=True
+    )
+    def test_refreshes_in_background_before_expiry(self, mock_refresh):
+        now = datetime.datetime.now(datetime.UTC)
+        refresh_margin = datetime.timedelta(hours=1)
+        # Valid when first read, and inside the refresh margin two seconds later
+        _write_token(self.token_path, now + refresh_margin + datetime.timedelta(seconds=2))
+        refreshed = threading.Event()
+
+        def refresh(creds, request):
+            creds.token = "background-token"
+            creds.expiry = (now + datetime.timedelta(hours=3)).replace(tzinfo=None)
+            refreshed.set()
+
+        mock_refresh.side_effect = refresh
+        provider = self._provider(refresh_margin=refresh_margin)
+
+        self.assertEqual(provider.get().token, "access-token")
+        mock_refresh.assert_not_called()
+
+        self.assertTrue(refreshed.wait(10))
+        deadline = time.monotonic() + 10
+        while provider.get().token != "background-token" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(provider.get().token, "background-token")
+        with open(self.token_path) as f:
+            self.assertEqual(json.load(f)["token"], "background-token")
+        mock_refresh.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
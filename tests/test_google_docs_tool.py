@@ -1,16 +1,32 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import MagicMock, patch
 
-from agents.sow_agent.tools.google_docs_tool import (
+from agents.doc_agent.tools.google_docs_tool import (
+    _blocks_to_markdown,
+    _iter_markdown_file_chunks,
+    _journal_path,
+    _markdown_to_docs_requests,
+    _read_cache,
+    _split_markdown_chunks,
     create_document,
+    read_document_as_markdown,
+    render_document_requests,
+    replay_rendered_requests,
+    write_batch_to_document,
+    write_markdown_file,
     write_markdown_to_document,
     write_to_document,
 )
 
 
 class TestGoogleDocsTool(unittest.TestCase):
-    @patch("agents.sow_agent.tools.google_docs_tool._get_credentials")
-    @patch("agents.sow_agent.tools.google_docs_tool.build")
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
     def test_create_document(self, mock_build, mock_get_credentials):
         mock_service = MagicMock()
         mock_build.return_value = mock_service
@@ -30,8 +46,8 @@ class TestGoogleDocsTool(unittest.TestCase):
             body={"title": "Test Document"}
         )
 
-    @patch("agents.sow_agent.tools.google_docs_tool._get_credentials")
-    @patch("agents.sow_agent.tools.google_docs_tool.build")
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
     def test_write_to_document(self, mock_build, mock_get_credentials):
         mock_service = MagicMock()
         mock_build.return_value = mock_service
@@ -72,8 +88,8 @@ class TestGoogleDocsTool(unittest.TestCase):
             },
         )
 
-    @patch("agents.sow_agent.tools.google_docs_tool._get_credentials")
-    @patch("agents.sow_agent.tools.google_docs_tool.build")
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
     def test_write_markdown_to_document(self, mock_build, mock_get_credentials):
         mock_service = MagicMock()
         mock_build.return_value = mock_service
@@ -113,6 +129,387 @@ This is a **bold** paragraph with *italic* text.
         requests = call_args[1]["body"]["requests"]
         self.assertGreater(len(requests), 0)
 
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_write_batch_to_document(self, mock_build, mock_get_credentials):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+        mock_service.documents().get.return_value.execute.return_value = {
+            "body": {"content": [{"endIndex": 10}]}
+        }
+
+        write_batch_to_document(
+            "test_document_id",
+            [("# Intro\n", True), ("Plain text", False), ("Some **bold**.\n", True)],
+        )
+
+        mock_service.documents().get.assert_called_once_with(documentId="test_document_id")
+        mock_service.documents().batchUpdate.assert_called_once()
+        requests = mock_service.documents().batchUpdate.call_args[1]["body"]["requests"]
+        inserts = [
+            (r["insertText"]["location"]["index"], r["insertText"]["text"])
+            for r in requests
+            if "insertText" in r
+        ]
+        self.assertEqual(
+            inserts, [(9, "Intro\n"), (15, "Plain text"), (25, "Some bold.\n")]
+        )
+
+    def test_split_markdown_chunks_keeps_blocks_whole(self):
+        markdown_content = "# Title\n\n```\nline 1\n\nline 2\n```\n\n- a\n- b\n\nEnd\n"
+
+        chunks = _split_markdown_chunks(markdown_content, 10)
+
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], len(markdown_content))
+        pieces = [markdown_content[start:end] for start, end in chunks]
+        self.assertEqual("".join(pieces), markdown_content)
+        self.assertIn("```\nline 1\n\nline 2\n```\n\n", pieces)
+        self.assertIn("- a\n- b\n\n", pieces)
+
+    @patch("agents.doc_agent.tools.google_docs_tool.JOURNAL_CHUNK_SIZE", 20)
+    @patch("agents.doc_agent.tools.google_docs_tool.JOURNAL_THRESHOLD", 10)
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_write_markdown_to_document_resumes_from_journal(
+        self, mock_build, mock_get_credentials
+    ):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+
+        markdown_content = "First paragraph.\n\nSecond paragraph.\n\nThird paragraph.\n"
+        chunks = _split_markdown_chunks(markdown_content, 20)
+        self.assertEqual(len(chunks), 3)
+
+        # The first chunk was acknowledged by an earlier, failed attempt
+        first_requests = _markdown_to_docs_requests(
+            markdown_content[chunks[0][0] : chunks[0][1]], 1
+        )
+        end_index = 1 + len(first_requests[0]["insertText"]["text"])
+        mock_service.documents().get.return_value.execute.return_value = {
+            "revisionId": "rev-1",
+            "body": {"content": [{"endIndex": end_index + 1}]},
+        }
+        mock_service.documents().batchUpdate.return_value.execute.return_value = {
+            "writeControl": {"requiredRevisionId": "rev-2"}
+        }
+
+        with (
+            tempfile.TemporaryDirectory() as journal_dir,
+            patch.dict(os.environ, {"GOOGLE_DOCS_JOURNAL_DIR": journal_dir}),
+        ):
+            content_hash = hashlib.sha256(markdown_content.encode("utf-8")).hexdigest()
+            journal_path = _journal_path("test_document_id", content_hash)
+            with open(journal_path, "w") as f:
+                json.dump(
+                    {
+                        "document_id": "test_document_id",
+                        "content_hash": content_hash,
+                        "chunks": [{"start": a, "end": b, "sha256": ""} for a, b in chunks],
+                        "last_acked_chunk": 0,
+                        "revision_id": "rev-1",
+                        "end_index": end_index,
+                    },
+                    f,
+                )
+
+            write_markdown_to_document("test_document_id", markdown_content)
+
+            self.assertFalse(os.path.exists(journal_path))
+
+        # Only the two unacknowledged chunks were sent, starting at the end index
+        calls = mock_service.documents().batchUpdate.call_args_list
+        self.assertEqual(len(calls), 2)
+        first_request = calls[0][1]["body"]["requests"][0]
+        self.assertEqual(first_request["insertText"]["location"]["index"], end_index)
+        self.assertEqual(first_request["insertText"]["text"], "Second paragraph.\n")
+
+    @patch("agents.doc_agent.tools.google_docs_tool.JOURNAL_CHUNK_SIZE", 20)
+    @patch("agents.doc_agent.tools.google_docs_tool.JOURNAL_THRESHOLD", 10)
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_journaled_write_resolves_references_across_chunks(
+        self, mock_build, mock_get_credentials
+    ):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+        mock_service.documents().get.return_value.execute.return_value = {
+            "revisionId": "rev-1",
+            "body": {"content": [{"endIndex": 10}]},
+        }
+        mock_service.documents().batchUpdate.return_value.execute.return_value = {
+            "writeControl": {"requiredRevisionId": "rev-2"}
+        }
+
+        markdown_content = (
+            "See [the spec][spec].\n\nSecond paragraph.\n\n"
+            "[spec]: https://spec.commonmark.org\n"
+        )
+        self.assertGreater(len(_split_markdown_chunks(markdown_content, 20)), 1)
+        with (
+            tempfile.TemporaryDirectory() as journal_dir,
+            patch.dict(os.environ, {"GOOGLE_DOCS_JOURNAL_DIR": journal_dir}),
+        ):
+            write_markdown_to_document("test_document_id", markdown_content)
+
+        calls = mock_service.documents().batchUpdate.call_args_list
+        sent = [r for call in calls for r in call[1]["body"]["requests"]]
+        self.assertEqual(sent, _markdown_to_docs_requests(markdown_content, 9))
+        self.assertEqual(sent[0]["insertText"]["text"], "See the spec.\n")
+
+    def test_iter_markdown_file_chunks_splits_only_between_blocks(self):
+        markdown_content = (
+            b"# Title\n\nIntro.\n\n```\ncode\n\nmore code\n```\n\n"
+            b"- a\n\n  continued\n- b\n\n<!-- note\n\nstill a comment -->\n\nEnd.\n"
+        )
+        with tempfile.TemporaryFile() as f:
+            f.write(markdown_content)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                chunks = list(_iter_markdown_file_chunks(mm, 1))
+
+        pieces = [markdown_content[start:end] for start, end in chunks]
+        self.assertEqual(b"".join(pieces), markdown_content)
+        self.assertEqual(
+            pieces,
+            [
+                b"# Title\n\n",
+                b"Intro.\n\n",
+                b"```\ncode\n\nmore code\n```\n\n- a\n\n  continued\n- b\n\n",
+                b"<!-- note\n\nstill a comment -->\n\n",
+                b"End.\n",
+            ],
+        )
+
+    @patch("agents.doc_agent.tools.google_docs_tool.FILE_CHUNK_SIZE", 16)
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_write_markdown_file_matches_in_memory_conversion(
+        self, mock_build, mock_get_credentials
+    ):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+        mock_service.documents().get.return_value.execute.return_value = {
+            "body": {"content": [{"endIndex": 10}]}
+        }
+
+        markdown_content = (
+            "# Heading\n\nA **bold** paragraph.\n\n- item 1\n- item 2\n\n"
+            "> quoted *text*\n\n```\ncode block\n```\n\nA [link](https://example.com).\n\n"
+            "<!-- a comment\n\nspanning a blank line -->\n\n"
+            "See [the spec][spec] and [spec].\n\n"
+            "Trailing paragraph.\n\n"
+            "[spec]: https://spec.commonmark.org\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "appendix.md")
+            with open(path, "w") as f:
+                f.write(markdown_content)
+
+            write_markdown_file("test_document_id", path, max_workers=2)
+
+        calls = mock_service.documents().batchUpdate.call_args_list
+        self.assertGreater(len(calls), 1)
+        sent = [r for call in calls for r in call[1]["body"]["requests"]]
+        self.assertEqual(sent, _markdown_to_docs_requests(markdown_content, 9))
+
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_read_document_as_markdown(self, mock_build, mock_get_credentials):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+        _read_cache.clear()
+
+        def paragraph(*runs, style=None, bullet=None):
+            para = {"elements": [{"textRun": run} for run in runs]}
+            if style:
+                para["paragraphStyle"] = style
+            if bullet:
+                para["bullet"] = bullet
+            return {"paragraph": para}
+
+        courier = {"weightedFontFamily": {"fontFamily": "Courier New"}}
+        document = {
+            "body": {
+                "content": [
+                    {"sectionBreak": {}},
+                    paragraph(
+                        {"content": "Heading\n"}, style={"namedStyleType": "HEADING_1"}
+                    ),
+                    paragraph(
+                        {"content": "A "},
+                        {"content": "bold", "textStyle": {"bold": True}},
+                        {"content": " and "},
+                        {"content": "italic ", "textStyle": {"italic": True}},
+                        {"content": "link", "textStyle": {"link": {"url": "https://x.y"}}},
+                        {"content": " with "},
+                        {"content": "code", "textStyle": courier},
+                        {"content": ".\n"},
+                    ),
+                    paragraph({"content": "one\n"}, bullet={"listId": "b"}),
+                    paragraph({"content": "two\n"}, bullet={"listId": "b"}),
+                    paragraph({"content": "first\n"}, bullet={"listId": "n"}),
+                    paragraph(
+                        {"content": "quoted\n"},
+                        style={"indentStart": {"magnitude": 36, "unit": "PT"}},
+                    ),
+                    paragraph({"content": "line 1\n", "textStyle": courier}),
+                    paragraph({"content": "line 2\n", "textStyle": courier}),
+                ]
+            },
+            "lists": {
+                "b": {"listProperties": {"nestingLevels": [{"glyphSymbol": "●"}]}},
+                "n": {"listProperties": {"nestingLevels": [{"glyphType": "DECIMAL"}]}},
+            },
+            "revisionId": "rev-1",
+        }
+        full_request = MagicMock()
+        full_request.execute.return_value = document
+        revision_request = MagicMock()
+        revision_request.execute.return_value = {"revisionId": "rev-1"}
+        mock_service.documents().get.side_effect = lambda documentId, fields: (
+            revision_request if fields == "revisionId" else full_request
+        )
+
+        markdown = read_document_as_markdown("test_document_id")
+
+        self.assertEqual(
+            markdown,
+            "# Heading\n\n"
+            "A **bold** and *italic* [link](https://x.y) with `code`.\n\n"
+            "- one\n- two\n\n"
+            "1. first\n\n"
+            "> quoted\n\n"
+            "```\nline 1\nline 2\n```\n",
+        )
+
+        # An unchanged revision is served from the cache
+        self.assertEqual(read_document_as_markdown("test_document_id"), markdown)
+        full_request.execute.assert_called_once()
+        revision_request.execute.assert_called_once()
+
+    def test_blocks_to_markdown_keeps_blank_lines_in_code(self):
+        def code(text):
+            return {"type": "code", "text": text}
+
+        blank = {"type": "paragraph", "text": ""}
+        blocks = [
+            code("def f():"),
+            code("    return 1"),
+            blank,
+            blank,
+            code("def g():"),
+            code("    pass"),
+            blank,
+            {"type": "paragraph", "text": "After"},
+        ]
+
+        self.assertEqual(
+            _blocks_to_markdown(blocks, {}),
+            "```\ndef f():\n    return 1\n\n\ndef g():\n    pass\n```\n\nAfter\n",
+        )
+
+    @patch("agents.doc_agent.tools.google_docs_tool.JOURNAL_CHUNK_SIZE", 20)
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_render_and_replay_requests(self, mock_build, mock_get_credentials):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+        mock_service.documents().get.return_value.execute.return_value = {
+            "body": {"content": [{"endIndex": 10}]}
+        }
+        mock_service.documents().batchUpdate.return_value.execute.return_value = {
+            "writeControl": {"requiredRevisionId": "rev-2"}
+        }
+
+        markdown_content = (
+            "# Heading\n\nA **bold** [paragraph][p].\n\n- item 1\n- item 2\n\n"
+            "[p]: https://example.com\n"
+        )
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            patch.dict(os.environ, {"GOOGLE_DOCS_JOURNAL_DIR": tmp_dir}),
+        ):
+            path = os.path.join(tmp_dir, "rendered.jsonl")
+            write_markdown_to_document("doc-a", markdown_content, render_path=path)
+            render_document_requests("doc-b", "plain text", path, is_markdown=False)
+
+            # Rendering never touches the API
+            mock_build.assert_not_called()
+
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(
+                [(r["document_id"], r["chunk"]) for r in records],
+                [("doc-a", 0), ("doc-a", 1), ("doc-a", 2), ("doc-b", 0)],
+            )
+            self.assertEqual(
+                records[3]["content_hash"], hashlib.sha256(b"plain text").hexdigest()
+            )
+
+            stats = replay_rendered_requests([path], max_concurrency=1)
+            sent_calls = list(mock_service.documents().batchUpdate.call_args_list)
+
+            # A rerun skips the acknowledged chunks instead of appending them again
+            rerun_stats = replay_rendered_requests([path], max_concurrency=1)
+
+        self.assertEqual(stats["documents"], 2)
+        self.assertEqual(stats["chunks"], 4)
+        self.assertEqual(stats["skipped_chunks"], 0)
+        self.assertEqual(rerun_stats["chunks"], 0)
+        self.assertEqual(rerun_stats["skipped_chunks"], 4)
+        self.assertEqual(mock_service.documents().batchUpdate.call_args_list, sent_calls)
+        sent = {}
+        for call in mock_service.documents().batchUpdate.call_args_list:
+            sent.setdefault(call[1]["documentId"], []).extend(call[1]["body"]["requests"])
+        self.assertEqual(sent["doc-a"], _markdown_to_docs_requests(markdown_content, 9))
+        self.assertEqual(
+            sent["doc-b"], [{"insertText": {"location": {"index": 9}, "text": "plain text"}}]
+        )
+
+
+    @patch("agents.doc_agent.tools.google_docs_tool._get_credentials")
+    @patch("agents.doc_agent.tools.google_docs_tool.build")
+    def test_replay_sends_identical_writes_separately(self, mock_build, mock_get_credentials):
+        mock_service = MagicMock()
+        mock_build.return_value = mock_service
+        mock_get_credentials.return_value = MagicMock()
+        mock_service.documents().get.return_value.execute.return_value = {
+            "body": {"content": [{"endIndex": 10}]}
+        }
+        mock_service.documents().batchUpdate.return_value.execute.return_value = {
+            "writeControl": {"requiredRevisionId": "rev-2"}
+        }
+
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            patch.dict(os.environ, {"GOOGLE_DOCS_JOURNAL_DIR": tmp_dir}),
+        ):
+            path = os.path.join(tmp_dir, "rendered.jsonl")
+            render_document_requests("doc-a", "## Notes\n\nTBD\n", path)
+            render_document_requests("doc-a", "## Other\n", path)
+            render_document_requests("doc-a", "## Notes\n\nTBD\n", path)
+
+            stats = replay_rendered_requests([path], max_concurrency=1)
+            rerun_stats = replay_rendered_requests([path], max_concurrency=1)
+
+        self.assertEqual(stats["documents"], 3)
+        self.assertEqual(stats["chunks"], 3)
+        self.assertEqual(stats["skipped_chunks"], 0)
+        self.assertEqual(rerun_stats["skipped_chunks"], 3)
+        texts = [
+            "".join(
+                r["insertText"]["text"] for r in call[1]["body"]["requests"] if "insertText" in r
+            )
+            for call in mock_service.documents().batchUpdate.call_args_list
+        ]
+        self.assertEqual(texts, ["Notes\nTBD\n", "Other\n", "Notes\nTBD\n"])
 
 if __name__ == "__main__":
     unittest.main()
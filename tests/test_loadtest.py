@@ -0,0 +1,43 @@
+import math
+import unittest
+from unittest.mock import patch
+
+from workflows.loadtest import RssSampler, find_saturation, percentile
+
+
+def _level(concurrency, p95):
+    return {"concurrency": concurrency, "p95": p95}
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = [5.0, 1.0, 4.0, 2.0, 3.0]
+
+        self.assertEqual(percentile(values, 50), 3.0)
+        self.assertEqual(percentile(values, 95), 5.0)
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile([7.0], 99), 7.0)
+        self.assertTrue(math.isnan(percentile([], 50)))
+
+    def test_find_saturation_compares_against_lowest_concurrency(self):
+        levels = [_level(4, 1.4), _level(1, 1.0), _level(8, 1.6), _level(2, 1.2)]
+
+        self.assertEqual(find_saturation(levels), 8)
+
+    def test_find_saturation_not_reached(self):
+        self.assertIsNone(find_saturation([_level(1, 1.0), _level(2, 1.5)]))
+        self.assertIsNone(find_saturation([_level(1, 1.0)]))
+        self.assertIsNone(find_saturation([]))
+
+    @patch("workflows.loadtest.current_rss_mb")
+    def test_rss_sampler_reports_peak_of_sampled_period(self, mock_current_rss):
+        mock_current_rss.side_effect = [100.0, 250.0, 120.0]
+
+        with RssSampler(interval=60) as rss:
+            rss._sample()
+
+        self.assertEqual(rss.peak_mb, 250.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import threading
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from workflows import profiling
+
+
+class TestProfilingEnabled(unittest.TestCase):
+    @patch.dict(os.environ, {profiling.PROFILE_ENV_VAR: "1"})
+    @patch("workflows.profiling.flow_run")
+    def test_env_var_used_when_parameter_is_none(self, mock_flow_run):
+        mock_flow_run.parameters = {"profile": None}
+        self.assertTrue(profiling.profiling_enabled())
+
+    @patch.dict(os.environ, {profiling.PROFILE_ENV_VAR: "1"})
+    @patch("workflows.profiling.flow_run")
+    def test_parameter_overrides_env_var(self, mock_flow_run):
+        mock_flow_run.parameters = {"profile": False}
+        self.assertFalse(profiling.profiling_enabled())
+
+    @patch.dict(os.environ, {}, clear=True)
+    @patch("workflows.profiling.flow_run")
+    def test_disabled_by_default(self, mock_flow_run):
+        mock_flow_run.parameters = {"profile": None}
+        self.assertFalse(profiling.profiling_enabled())
+
+
+class TestProfileTask(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        env = patch.dict(os.environ, {profiling.PROFILE_DIR_ENV_VAR: self.tmp_dir.name})
+        env.start()
+        self.addCleanup(env.stop)
+        enabled = patch("workflows.profiling.profiling_enabled", return_value=True)
+        enabled.start()
+        self.addCleanup(enabled.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    @patch("workflows.profiling.create_markdown_artifact")
+    def test_publishes_profile(self, mock_artifact):
+        @profiling.profile_task
+        def build_report():
+            return sum(range(1000))
+
+        self.assertEqual(build_report(), 499500)
+        mock_artifact.assert_called_once()
+        self.assertEqual(mock_artifact.call_args.kwargs["key"], "profile-build-report")
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @patch("workflows.profiling.create_markdown_artifact", side_effect=RuntimeError("no API"))
+    def test_publish_failure_does_not_fail_task(self, mock_artifact):
+        @profiling.profile_task
+        def build_report():
+            return "done"
+
+        with self.assertLogs("workflows.profiling", level="WARNING"):
+            self.assertEqual(build_report(), "done")
+
+    @patch("workflows.profiling.create_markdown_artifact")
+    def test_concurrent_tasks_profile_one_at_a_time(self, mock_artifact):
+        first_started = threading.Event()
+        second_done = threading.Event()
+
+        @profiling.profile_task
+        def slow_task():
+            first_started.set()
+            second_done.wait(5)
+            return "slow"
+
+        @profiling.profile_task
+        def fast_task():
+            return "fast"
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(slow_task()))
+        thread.start()
+        first_started.wait(5)
+        try:
+            self.assertEqual(fast_task(), "fast")
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            second_done.set()
+            thread.join(5)
+
+        self.assertEqual(results, ["slow"])
+        mock_artifact.assert_called_once()
+        self.assertEqual(mock_artifact.call_args.kwargs["key"], "profile-slow-task")
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+if __name__ == "__main__":
+    unittest.main()